@@ -0,0 +1,54 @@
+"""
+Compare the uwsgi (Flask) and ASGI stacks under the same load.
+
+Start both servers against the same database, e.g.:
+
+    PORT=5000 uwsgi core/api/uwsgi.ini
+    uvicorn core.api.asgi:app --port 8000 --workers 4
+
+then:
+
+    python -m benchmarks.asgi_vs_wsgi --concurrency 200 --requests 5000
+"""
+import asyncio
+
+import click
+
+from core.perf.client import run, summarize
+
+
+DEFAULT_PATHS = (
+    "/users/1",
+    "/users/1/average",
+    "/users/1/average/2019/6",
+    "/merchants/40",
+    "/merchants/40/average",
+)
+
+
+@click.command()
+@click.option("--wsgi", default="http://localhost:5000")
+@click.option("--asgi", default="http://localhost:8000")
+@click.option("--concurrency", default=100, type=int)
+@click.option("--requests", default=2000, type=int)
+@click.option(
+    "--path", "paths", multiple=True, default=DEFAULT_PATHS, type=str
+)
+def main(wsgi, asgi, concurrency, requests, paths):
+    loop = asyncio.get_event_loop()
+
+    for name, url in (("wsgi", wsgi), ("asgi", asgi)):
+        results, elapsed = loop.run_until_complete(
+            run(url, list(paths), concurrency, requests)
+        )
+        stats = summarize(results, elapsed)
+
+        click.echo(
+            f"{name}: {stats['throughput']} req/s, errors={stats['errors']} "
+            f"p50={stats['p50']:.1f}ms p95={stats['p95']:.1f}ms "
+            f"p99={stats['p99']:.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
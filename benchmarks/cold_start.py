@@ -0,0 +1,70 @@
+"""
+Latency of the first requests served by freshly started uwsgi workers,
+with and without the pre-fork warmup (`core.perf.warmup`).
+
+    python -m benchmarks.cold_start --database-uri postgresql://.../bench
+
+Each run starts uwsgi, then sends `--requests` requests per worker of
+the `flask perf load` mix, `--processes` at a time.
+"""
+import asyncio
+
+import click
+
+from core.perf.client import percentile
+from core.perf.load import DEFAULT_MIX, Server, load
+
+
+def cold_start(database_uri, warmup, processes, requests, port):
+    server = Server(
+        port,
+        processes,
+        env=dict(
+            SQLALCHEMY_DATABASE_URI=database_uri,
+            WARMUP_ENABLED=str(warmup).lower(),
+            METRICS_ENABLED="false",
+        ),
+    )
+
+    try:
+        server.wait()
+
+        loop = asyncio.get_event_loop()
+        results, _, _ = loop.run_until_complete(
+            load(server.url, DEFAULT_MIX, processes * requests, processes)
+        )
+
+    finally:
+        server.stop()
+
+    failed = [result for result in results if result.status != 200]
+
+    if failed:
+        raise click.ClickException(f"{len(failed)} requests failed")
+
+    return [result.duration * 1000 for result in results]
+
+
+@click.command()
+@click.option("--database-uri", required=True)
+@click.option("--runs", default=5, type=int)
+@click.option("--processes", default=4, type=int)
+@click.option("--requests", default=3, type=int, help="Per worker and run.")
+@click.option("--port", default=5051, type=int)
+def main(database_uri, runs, processes, requests, port):
+    for warmup in (False, True):
+        durations = []
+
+        for _ in range(runs):
+            durations += cold_start(database_uri, warmup, processes, requests, port)
+
+        durations.sort()
+
+        click.echo(
+            f"warmup={warmup}: p50={percentile(durations, 50):.1f}ms "
+            f"p99={percentile(durations, 99):.1f}ms max={durations[-1]:.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Size and latency of a listing payload with each response encoding.
+
+    python -m benchmarks.compression --rows 50 --rows 10000 --mbps 10
+
+Latency adds the compression time to the transfer time of the body at
+`--mbps`.
+"""
+from timeit import timeit
+
+import click
+
+from core.compression import encodings
+from core.dumper import get_dumper
+from core.json import dumps, make_encoder
+from core.models.all import Transaction
+
+from .factories import transactions as build_transactions
+
+
+def compress(encoding, level, data):
+    if encoding is None:
+        return data
+
+    compressor = encodings[encoding](level)
+    return compressor.compress(data) + compressor.finish()
+
+
+@click.command()
+@click.option("--rows", default=(50, 10000), type=int, multiple=True)
+@click.option("--level", default=6, type=int)
+@click.option("--mbps", default=10.0, type=float, help="Client bandwidth")
+@click.option("--number", default=20, type=int)
+def main(rows, level, mbps, number):
+    dump = get_dumper(Transaction.schema_class.compiled())
+    encoder = make_encoder()
+
+    for count in rows:
+        payload = dump(build_transactions(count, users=1000, merchants=130), many=True)
+        data = dumps(payload, encoder).encode()
+
+        click.echo(f"{count} rows")
+
+        for encoding in [None] + list(encodings):
+            size = len(compress(encoding, level, data))
+            duration = (
+                timeit(lambda: compress(encoding, level, data), number=number) / number
+            )
+            transfer = size * 8 / (mbps * 1e6)
+
+            click.echo(
+                f"  {encoding or 'identity'}: {size / 1024:.1f}KiB "
+                f"({size / len(data):.0%}), compress {duration * 1000:.2f}ms, "
+                f"latency {(duration + transfer) * 1000:.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Parse time of a column of dates, per row and with the batch API.
+
+    python -m benchmarks.dates --rows 1000000
+"""
+from datetime import date, datetime, timedelta
+from timeit import timeit
+
+import click
+from arrow.parser import DateTimeParser
+
+from core.dates import parse_dates, parse_iso_date, parse_iso_datetime
+
+
+@click.command()
+@click.option("--rows", default=1000000, type=int)
+@click.option("--days", default=365, type=int, help="Distinct dates in the column")
+def main(rows, days):
+    start = date(2019, 1, 1)
+    values = [
+        (start + timedelta(days=index % days)).isoformat() for index in range(rows)
+    ]
+    parser = DateTimeParser()
+
+    cases = dict(
+        arrow=lambda: [parser.parse_iso(value) for value in values],
+        strptime=lambda: [datetime.strptime(value, "%Y-%m-%d") for value in values],
+        parse_iso_datetime=lambda: [parse_iso_datetime(value) for value in values],
+        parse_iso_date=lambda: [parse_iso_date(value) for value in values],
+        parse_dates=lambda: parse_dates(values),
+    )
+
+    for name, case in cases.items():
+        duration = timeit(case, number=1)
+        click.echo(
+            f"{name}: {duration * 1000:.0f}ms ({duration / rows * 1e9:.0f}ns/row)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Throughput of `schema.dump` against the generated dump functions.
+
+    python -m benchmarks.dump --rows 100000
+"""
+import gc
+from time import perf_counter
+
+import click
+
+from core.dumper import get_dumper
+from core.json import dumps
+from core.models.all import Transaction
+
+from .factories import transactions as build_transactions
+
+
+@click.command()
+@click.option("--rows", default=100000, type=int)
+def main(rows):
+    transactions = build_transactions(rows, users=1000, merchants=130)
+    schema = Transaction.schema_class.compiled()
+    dump = get_dumper(schema)
+
+    cases = dict(
+        generated=lambda: dump(transactions, many=True),
+        marshmallow=lambda: schema.dump(transactions, many=True).data,
+    )
+
+    results = {}
+
+    for name, case in cases.items():
+        # Like `timeit`, keep the collector out of the measure.
+        gc.collect()
+        gc.disable()
+
+        try:
+            start = perf_counter()
+            results[name] = case()
+            duration = perf_counter() - start
+
+        finally:
+            gc.enable()
+
+        click.echo(f"{name}: {duration:.2f}s, {rows / duration:,.0f} rows/s")
+
+    assert dumps(results["marshmallow"]) == dumps(results["generated"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from core.models.all import Merchant, Transaction, User
+
+
+def transactions(count=50, users=10, merchants=10):
+    """
+    Build transient transactions with their user and merchant attached,
+    as loaded by the listing routes.
+    """
+    users = [User(id=index, email=f"user{index}@test.com") for index in range(users)]
+    merchants = [
+        Merchant(id=index, name=f"Merchant {index}") for index in range(merchants)
+    ]
+
+    return [
+        Transaction(
+            id=index,
+            amount=Decimal(index % 10000) / 100,
+            descriptor=f"CARD PAYMENT {index % 100}",
+            executed_at=date(2019, 1, 1) + timedelta(days=index % 365),
+            user_id=users[index % len(users)].id,
+            user=users[index % len(users)],
+            merchant_id=merchants[index % len(merchants)].id,
+            merchant=merchants[index % len(merchants)],
+        )
+        for index in range(count)
+    ]
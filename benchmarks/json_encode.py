@@ -0,0 +1,33 @@
+"""
+Encode time of a listing payload with each JSON backend.
+
+    python -m benchmarks.json_encode --rows 10000
+"""
+from timeit import timeit
+
+import click
+
+from core.dumper import get_dumper
+from core.json import backends, dumps, make_encoder
+from core.models.all import Transaction
+
+from .factories import transactions as build_transactions
+
+
+@click.command()
+@click.option("--rows", default=10000, type=int)
+@click.option("--number", default=20, type=int)
+def main(rows, number):
+    transactions = build_transactions(rows, users=1000, merchants=130)
+    payload = get_dumper(Transaction.schema_class.compiled())(transactions, many=True)
+
+    for name in backends:
+        encoder = make_encoder(name)
+        size = len(dumps(payload, encoder).encode())
+
+        duration = timeit(lambda: dumps(payload, encoder), number=number) / number
+        click.echo(f"{name}: {duration * 1000:.1f}ms, {size / 1024:.0f}KiB")
+
+
+if __name__ == "__main__":
+    main()
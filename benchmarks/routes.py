@@ -0,0 +1,183 @@
+"""
+Latency of every API route against the 1 second SLA.
+
+For each dataset size the database is seeded (`benchmarks.seed`), then
+each route is requested `--repeat` times through the Flask test client
+for the hottest entity (most transactions) and a cold one, including a
+deep page of the hottest entity listing:
+
+    python -m benchmarks.routes --database-uri postgresql://.../bench \\
+        --rows 1e4 --rows 1e6 --rows 1e7 --output results.json
+
+Results are written as JSON, keyed by dataset size then scenario.
+Compare them to a stored baseline with `--baseline`: the command fails
+when a p95 regressed by more than `--tolerance` or a p99 exceeds the SLA.
+"""
+import json
+from time import perf_counter
+
+import click
+from sqlalchemy import func
+
+from core.perf.client import percentile
+
+from .seed import seed
+
+
+def find_entities(session, column):
+    """
+    Hottest and coldest entities of `column`, with their transaction count.
+    """
+    from core.models.all import Transaction
+
+    counts = (
+        session.query(column, func.count(Transaction.id))
+        .filter(column.isnot(None))
+        .group_by(column)
+        .order_by(func.count(Transaction.id).desc(), column)
+        .all()
+    )
+
+    return dict(hot=counts[0], cold=counts[-1])
+
+
+def scenarios(session):
+    """
+    `name: path` of every measured request.
+    """
+    from core.models.all import Transaction
+
+    paths = {}
+
+    for prefix, column in (
+        ("users", Transaction.user_id),
+        ("merchants", Transaction.merchant_id),
+    ):
+        for kind, (entity_id, count) in find_entities(session, column).items():
+            base = f"/{prefix}/{entity_id}"
+
+            paths[f"{prefix}.list.{kind}"] = base
+            paths[f"{prefix}.average.{kind}"] = f"{base}/average"
+            paths[f"{prefix}.monthly_average.{kind}"] = f"{base}/average/2018/6"
+
+            if kind == "hot":
+                paths[f"{prefix}.deep_page.{kind}"] = f"{base}/{max(1, count // 100)}"
+
+    return paths
+
+
+def measure(client, path, repeat, warmup=3):
+    for _ in range(warmup):
+        client.get(path)
+
+    durations = []
+
+    for _ in range(repeat):
+        start = perf_counter()
+        response = client.get(path)
+        durations.append((perf_counter() - start) * 1000)
+
+        if response.status_code != 200:
+            raise click.ClickException(f"{path} answered {response.status_code}")
+
+    durations.sort()
+
+    return dict(
+        path=path,
+        p50=round(percentile(durations, 50), 3),
+        p95=round(percentile(durations, 95), 3),
+        p99=round(percentile(durations, 99), 3),
+        max=round(durations[-1], 3),
+    )
+
+
+def compare(results, baseline, tolerance, sla, floor=1.0):
+    """
+    Regressions of `results` against `baseline`: p95 slower by more than
+    `tolerance` (and `floor` ms) or p99 above `sla` ms.
+    """
+    failures = []
+
+    for size, routes in results.items():
+        for name, stats in routes.items():
+            if stats["p99"] > sla:
+                failures.append(f"{size} {name}: p99 {stats['p99']}ms > SLA {sla}ms")
+
+            reference = baseline.get(size, {}).get(name)
+
+            if reference is None:
+                continue
+
+            limit = max(reference["p95"] * (1 + tolerance), reference["p95"] + floor)
+
+            if stats["p95"] > limit:
+                failures.append(
+                    f"{size} {name}: p95 {stats['p95']}ms, "
+                    f"baseline {reference['p95']}ms (+{tolerance:.0%} allowed)"
+                )
+
+    return failures
+
+
+@click.command()
+@click.option("--database-uri", required=True, help="Database to overwrite.")
+@click.option("--rows", "sizes", multiple=True, default=(1e4, 1e6, 1e7), type=float)
+@click.option("--skew", default=3.0, type=float)
+@click.option("--repeat", default=50, type=int)
+@click.option("--no-seed", is_flag=True, help="Reuse the data already seeded.")
+@click.option("--output", type=click.Path(dir_okay=False))
+@click.option("--baseline", type=click.Path(exists=True, dir_okay=False))
+@click.option("--tolerance", default=0.2, type=float)
+@click.option("--sla", default=1000.0, type=float, help="p99 budget in ms.")
+def main(
+    database_uri, sizes, skew, repeat, no_seed, output, baseline, tolerance, sla
+):
+    from core.api.app import create_app
+    from core.models.base import db, session
+
+    app = create_app(dict(SQLALCHEMY_DATABASE_URI=database_uri))
+    client = app.test_client()
+    results = {}
+
+    with app.app_context():
+        db.create_all()
+
+        for rows in sizes:
+            rows = int(rows)
+
+            if not no_seed:
+                click.echo(f"Seeding {rows} transactions")
+
+                with db.engine.begin() as connection:
+                    seed(connection, rows, max(10, rows // 1000), skew)
+
+            routes = results[str(rows)] = {}
+
+            for name, path in scenarios(session).items():
+                session.remove()
+                stats = routes[name] = measure(client, path, repeat)
+
+                click.echo(
+                    f"{rows} {name}: p50={stats['p50']:.1f}ms "
+                    f"p95={stats['p95']:.1f}ms p99={stats['p99']:.1f}ms"
+                )
+
+    if output:
+        with open(output, "w") as file_:
+            json.dump(results, file_, indent=2, sort_keys=True)
+
+    if baseline:
+        with open(baseline) as file_:
+            failures = compare(results, json.load(file_), tolerance, sla)
+
+        for failure in failures:
+            click.secho(failure, fg="red", err=True)
+
+        if failures:
+            raise SystemExit(1)
+
+        click.echo("No regression.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Per-request cost of building the listing schema, with and without the
+compiled schema cache.
+
+    python -m benchmarks.schema_construction
+"""
+from timeit import timeit
+
+import click
+
+from core.models.all import Transaction
+
+from .factories import transactions as build_transactions
+
+
+@click.command()
+@click.option("--number", default=1000, type=int)
+@click.option("--page-size", default=50, type=int)
+def main(number, page_size):
+    transactions = build_transactions(page_size)
+
+    def listing(build):
+        schema = build()
+        return [schema.dump(transaction).data for transaction in transactions]
+
+    cases = dict(
+        construct=lambda: Transaction.schema_class(),
+        compiled=lambda: Transaction.schema_class.compiled(),
+        listing_construct=lambda: listing(Transaction.schema_class),
+        listing_compiled=lambda: listing(Transaction.schema_class.compiled),
+    )
+
+    for name, case in cases.items():
+        case()
+        duration = timeit(case, number=number) / number
+        click.echo(f"{name}: {duration * 1e6:.1f}us")
+
+
+if __name__ == "__main__":
+    main()
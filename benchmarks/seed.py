@@ -0,0 +1,97 @@
+"""
+Seed a benchmark database with skewed transactions.
+
+User and merchant ids are drawn as `floor(count * random() ^ skew) + 1`:
+with the default skew of 3 the first 10% of the users hold about half of
+the transactions, like the few very active accounts and big merchants
+of production.
+
+    python -m benchmarks.seed --database-uri postgresql://.../bench --rows 1e6
+"""
+from time import perf_counter
+
+import click
+from sqlalchemy import text
+
+from data.merchant_name import merchant_names
+
+
+INSERT_TRANSACTIONS = text(
+    """
+    insert into transaction (amount, descriptor, user_id, merchant_id, executed_at)
+    select
+        round((random() * 100)::numeric, 2),
+        merchant.name,
+        data.user_id,
+        case when data.matched then merchant.id end,
+        date '2017-01-01' + (random() * 1095)::int
+    from (
+        select
+            floor(:users * power(random(), :skew))::int + 1 as user_id,
+            floor(:merchants * power(random(), :skew))::int + 1 as merchant_id,
+            random() < :matched as matched
+        from generate_series(1, :rows)
+    ) as data
+    join merchant on merchant.id = data.merchant_id
+    """
+)
+
+
+def seed(connection, rows, users, skew=3.0, matched=0.9, chunk_size=1000000):
+    """
+    Replace the users, merchants and transactions of `connection`'s
+    database. `matched` is the share of transactions with a merchant.
+    """
+    connection.execute('truncate transaction, "user", merchant restart identity')
+
+    connection.execute(
+        text("insert into merchant (name) select unnest(:names)"),
+        names=list(merchant_names),
+    )
+    connection.execute(
+        text(
+            """
+            insert into "user" (email)
+            select concat('user', id, '@test.com') from generate_series(1, :users) id
+            """
+        ),
+        users=users,
+    )
+
+    for start in range(0, rows, chunk_size):
+        connection.execute(
+            INSERT_TRANSACTIONS,
+            rows=min(chunk_size, rows - start),
+            users=users,
+            merchants=len(merchant_names),
+            skew=skew,
+            matched=matched,
+        )
+
+    connection.execute("analyze")
+
+
+@click.command()
+@click.option("--database-uri", required=True, help="Database to overwrite.")
+@click.option("--rows", default=1e6, type=float)
+@click.option("--users", default=None, type=int, help="Defaults to rows / 1000.")
+@click.option("--skew", default=3.0, type=float)
+def main(database_uri, rows, users, skew):
+    from core.api.app import create_app
+    from core.models.base import db
+
+    app = create_app(dict(SQLALCHEMY_DATABASE_URI=database_uri))
+    rows = int(rows)
+
+    with app.app_context():
+        db.create_all()
+        start = perf_counter()
+
+        with db.engine.begin() as connection:
+            seed(connection, rows, users or max(10, rows // 1000), skew)
+
+        click.echo(f"Seeded {rows} transactions in {perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
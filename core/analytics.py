@@ -0,0 +1,385 @@
+"""
+Columnar snapshot of the transactions, memory-mapped by every worker.
+
+A snapshot is a directory holding one view per entity (user, merchant).
+Each view stores the transactions sorted by `(entity id, executed_at)`
+as flat NumPy arrays:
+
+    offsets.npy      int64, rows of entity `i` are `offsets[i]:offsets[i + 1]`
+    amount.npy       int64, amount in cents
+    cumsum.npy       int64, running total of `amount` (prefixed by 0)
+    executed_at.npy  int32, days since 1970-01-01
+    counterpart.npy  int32, merchant id for the user view and vice versa,
+                     unmatched transactions have merchant `0`
+
+`ANALYTICS_PATH/current` is a symlink to the latest snapshot. Refreshing
+writes a new snapshot next to it and swaps the link, workers pick it up
+on their next lookup while pages of the previous files stay valid until
+they unmap them. The snapshot replaced is kept until the next refresh.
+
+Transactions are expected to be append-only: a refresh only fetches
+rows past the stored id watermark, run a full refresh to pick up
+updated or late-committed rows.
+"""
+import json
+import os
+import shutil
+from datetime import date
+from time import monotonic
+
+import numpy as np
+from sqlalchemy import BigInteger, cast, func, select
+
+from core.dates import utcnow
+from core.models.all import Transaction
+
+
+EPOCH = date(1970, 1, 1)
+
+
+# Entity name: (sort key column, counterpart column)
+VIEWS = dict(user=(2, 3), merchant=(3, 2))
+
+# Columns fetched by `fetch`
+ID, AMOUNT, USER, MERCHANT, EXECUTED_AT = range(5)
+
+
+def fetch(connection, watermark=0, chunk_size=100000):
+    """
+    Fetch transactions past `watermark` as an int64 matrix, amounts and
+    dates are converted by postgres.
+    """
+    statement = (
+        select(
+            [
+                Transaction.id,
+                cast(Transaction.amount * 100, BigInteger),
+                Transaction.user_id,
+                func.coalesce(Transaction.merchant_id, 0),
+                Transaction.executed_at - EPOCH,
+            ]
+        )
+        .where(Transaction.id > watermark)
+        .order_by(Transaction.id)
+    )
+
+    result = connection.execution_options(stream_results=True).execute(statement)
+    chunks = []
+
+    while True:
+        rows = result.fetchmany(chunk_size)
+
+        if not rows:
+            break
+
+        chunks.append(np.array([tuple(row) for row in rows], dtype=np.int64))
+
+    if not chunks:
+        return np.empty((0, 5), dtype=np.int64)
+
+    return np.concatenate(chunks)
+
+
+def sort_key(entity, executed_at):
+    return (entity.astype(np.int64) << 32) | (executed_at.astype(np.int64) + 2 ** 31)
+
+
+class View:
+    """
+    Rows of a snapshot sorted by one entity.
+    """
+
+    def __init__(self, path):
+        def load(name):
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+
+        self.offsets = load("offsets")
+        self.amount = load("amount")
+        self.cumsum = load("cumsum")
+        self.executed_at = load("executed_at")
+        self.counterpart = load("counterpart")
+
+    def bounds(self, entity_id):
+        if not 0 <= entity_id < len(self.offsets) - 1:
+            return 0, 0
+
+        return int(self.offsets[entity_id]), int(self.offsets[entity_id + 1])
+
+    def entities(self):
+        offsets = self.offsets
+        return np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+
+    @staticmethod
+    def build(path, rows, key, counterpart, previous=None):
+        """
+        Write the view of `rows` sorted by the `key` column, merged into the
+        `previous` view when given.
+        """
+        rows = rows[np.lexsort((rows[:, EXECUTED_AT], rows[:, key]))]
+
+        entity = rows[:, key]
+        columns = dict(
+            amount=rows[:, AMOUNT],
+            executed_at=rows[:, EXECUTED_AT].astype(np.int32),
+            counterpart=rows[:, counterpart].astype(np.int32),
+        )
+
+        if previous is not None:
+            previous_entity = previous.entities()
+            positions = np.searchsorted(
+                sort_key(previous_entity, previous.executed_at),
+                sort_key(entity, columns["executed_at"]),
+                side="right",
+            )
+
+            entity = np.insert(previous_entity, positions, entity)
+            columns = {
+                name: np.insert(getattr(previous, name), positions, values)
+                for name, values in columns.items()
+            }
+
+        size = int(entity.max()) + 2 if len(entity) else 1
+        columns["offsets"] = np.searchsorted(entity, np.arange(size)).astype(np.int64)
+        columns["cumsum"] = np.concatenate(([0], np.cumsum(columns["amount"])))
+
+        os.makedirs(path)
+
+        for name, values in columns.items():
+            np.save(os.path.join(path, f"{name}.npy"), values)
+
+
+class Snapshot:
+    def __init__(self, path):
+        self.path = path
+
+        with open(os.path.join(path, "meta.json")) as file_:
+            self.meta = json.load(file_)
+
+        self.views = {name: View(os.path.join(path, name)) for name in VIEWS}
+
+
+def current_path(path):
+    return os.path.join(path, "current")
+
+
+def load_snapshot(path):
+    link = current_path(path)
+
+    if not os.path.exists(link):
+        return None
+
+    return Snapshot(os.path.realpath(link))
+
+
+def refresh(path, connection, full=False, chunk_size=100000):
+    """
+    Build a new snapshot in `path` from transactions past the current
+    watermark (from scratch when `full`) and make it current.
+    Returns the metadata of the current snapshot.
+    """
+    current = load_snapshot(path)
+    previous = None if full else current
+    watermark = previous.meta["watermark"] if previous else 0
+
+    rows = fetch(connection, watermark, chunk_size)
+
+    if previous is not None and len(rows) == 0:
+        return previous.meta
+
+    # Always a new directory, a full refresh doesn't overwrite the current one.
+    version = current.meta["version"] + 1 if current else 1
+    target = os.path.join(path, f"snapshot-{version}")
+
+    if os.path.exists(target):
+        # Left by an interrupted refresh.
+        shutil.rmtree(target)
+
+    for name, (key, counterpart) in VIEWS.items():
+        View.build(
+            os.path.join(target, name),
+            rows,
+            key,
+            counterpart,
+            previous.views[name] if previous else None,
+        )
+
+    meta = dict(
+        version=version,
+        watermark=int(rows[:, ID].max()) if len(rows) else watermark,
+        rows=(previous.meta["rows"] if previous else 0) + len(rows),
+        created_at=utcnow().isoformat(),
+    )
+
+    with open(os.path.join(target, "meta.json"), "w") as file_:
+        json.dump(meta, file_)
+
+    # Atomically swap the `current` link.
+    link = current_path(path)
+    tmp_link = f"{link}.tmp"
+
+    if os.path.lexists(tmp_link):
+        os.remove(tmp_link)
+
+    os.symlink(os.path.basename(target), tmp_link)
+    os.replace(tmp_link, link)
+
+    # The replaced snapshot is kept for workers still loading it, older ones
+    # are removed (workers mapping their files keep their pages until they
+    # reload).
+    keep = {os.path.basename(target)}
+
+    if current is not None:
+        keep.add(os.path.basename(current.path))
+
+    for name in os.listdir(path):
+        if name.startswith("snapshot-") and name not in keep:
+            shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+
+    return meta
+
+
+def month_bounds(year, month):
+    start = np.datetime64(f"{year:04d}-{month:02d}", "M")
+    days = np.array([start, start + 1]).astype("datetime64[D]").astype(np.int64)
+    return days[0], days[1]
+
+
+class Analytics:
+    """
+    Answer transaction statistics for a user or a merchant from the
+    current snapshot. Amounts are returned in cents.
+    """
+
+    def __init__(self, path, check_interval=1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._snapshot = None
+        self._target = None
+        self._checked_at = None
+
+    @property
+    def snapshot(self):
+        now = monotonic()
+
+        if self._checked_at is None or now - self._checked_at > self.check_interval:
+            self._checked_at = now
+
+            try:
+                target = os.readlink(current_path(self.path))
+
+            except OSError:
+                target = None
+
+            if target != self._target:
+                self._snapshot = load_snapshot(self.path) if target else None
+                self._target = target
+
+        if self._snapshot is None:
+            raise LookupError(f"No analytics snapshot in {self.path}.")
+
+        return self._snapshot
+
+    def view(self, entity):
+        return self.snapshot.views[entity]
+
+    def stats(self, entity, entity_id, year=None, month=None):
+        """
+        Count, total and average basket of `entity`, optionally for a month.
+        """
+        view = self.view(entity)
+        start, end = view.bounds(entity_id)
+
+        if year is not None and month is not None:
+            first, last = month_bounds(year, month)
+            days = view.executed_at[start:end]
+            start, end = start + np.searchsorted(days, [first, last])
+
+        count = int(end - start)
+        total = int(view.cumsum[end] - view.cumsum[start])
+
+        return dict(
+            count=count, total=total, average=total / count if count else None
+        )
+
+    def monthly(self, entity, entity_id):
+        """
+        Per month count, total and average basket of `entity`.
+        """
+        view = self.view(entity)
+        start, end = view.bounds(entity_id)
+
+        if start == end:
+            return []
+
+        months = view.executed_at[start:end].astype("datetime64[D]")
+        months = months.astype("datetime64[M]")
+
+        starts = np.flatnonzero(np.r_[True, months[1:] != months[:-1]])
+        counts = np.diff(np.r_[starts, len(months)])
+        totals = np.add.reduceat(view.amount[start:end], starts)
+
+        return [
+            dict(
+                month=str(months[index]),
+                count=int(count),
+                total=int(total),
+                average=total / count,
+            )
+            for index, count, total in zip(starts, counts, totals)
+        ]
+
+    def top(self, entity, entity_id, limit=10):
+        """
+        Counterparts of `entity` (merchants of a user, users of a merchant)
+        with the highest total amount.
+        """
+        view = self.view(entity)
+        start, end = view.bounds(entity_id)
+        counterpart = view.counterpart[start:end]
+
+        totals = np.bincount(counterpart, weights=view.amount[start:end])
+        counts = np.bincount(counterpart)
+
+        return ranking(totals, counts, limit)
+
+    def ranking(self, entity, limit=10):
+        """
+        Entities with the highest total amount.
+        """
+        view = self.view(entity)
+        offsets = np.asarray(view.offsets)
+
+        totals = view.cumsum[offsets[1:]] - view.cumsum[offsets[:-1]]
+        counts = np.diff(offsets)
+
+        return ranking(totals, counts, limit)
+
+
+def ranking(totals, counts, limit):
+    ids = np.flatnonzero(counts)
+
+    if limit <= 0:
+        return []
+
+    if limit < len(ids):
+        ids = ids[np.argpartition(-totals[ids], limit - 1)[:limit]]
+
+    ids = ids[np.argsort(-totals[ids], kind="stable")]
+
+    return [
+        dict(id=int(id_), count=int(counts[id_]), total=int(totals[id_]))
+        for id_ in ids
+    ]
+
+
+_engines = dict()
+
+
+def get_analytics(path):
+    """
+    Return the analytics engine of `path`, shared by the whole process.
+    """
+    if path not in _engines:
+        _engines[path] = Analytics(path)
+
+    return _engines[path]
@@ -3,10 +3,16 @@ from flask_uuid import FlaskUUID
 from flask_restplus import Api
 from dotenv import load_dotenv
 
-from core.json import JSONEncoder
+from core.compression import init_compression
+from core.json import make_encoder
 from core.io import Request
 from core.cli import init_cli
 from core.models.base import db, session
+from core.models.pool import pool_stats
+from core.perf.metrics import init_metrics
+from core.perf.profiling import init_profiling
+from core.perf.slow_queries import init_slow_queries
+from core.timing import init_timing
 
 from core.api.blueprints.merchants.resources import merchants
 from core.api.blueprints.user.resources import users
@@ -18,7 +24,7 @@ def register_blueprints(app):
 
 
 def bootstrap_app(app):
-    app.json_encoder = JSONEncoder
+    app.json_encoder = make_encoder(app.config["JSON_BACKEND"])
     app.config["RESTFUL_JSON"] = {"cls": app.json_encoder}
 
     FlaskUUID(app)
@@ -36,6 +42,10 @@ def create_app(config=None, **kwargs):
     if config:
         app.config.update(config)
     db.init_app(app)
+    init_profiling(app)
+    init_timing(app)
+    init_slow_queries(app)
+    init_metrics(app)
 
     register_blueprints(app)
     # Health check
@@ -44,7 +54,7 @@ def create_app(config=None, **kwargs):
     @app.before_request
     def health_check():
         if request.path == app.health_check_path:
-            return jsonify(dict(status="healthy"))
+            return jsonify(dict(status="healthy", pool=pool_stats(db.engine)))
 
     @app.after_request
     def headers(response):
@@ -57,9 +67,9 @@ def create_app(config=None, **kwargs):
         session.commit()
         return response
 
+    init_compression(app)
     bootstrap_app(app)
     init_cli(app)
 
-    print(app.url_map)
     api.init_app(app)
     return app
@@ -0,0 +1,336 @@
+"""
+ASGI variant of the read API, backed by an asyncpg connection pool.
+
+Serve it with any ASGI server:
+
+    uvicorn core.api.asgi:app --workers 4
+
+Statements are built from the SQLAlchemy models and rows are hydrated
+into transient model instances, dumped with the same schemas and encoded
+with the same JSON encoder as the Flask application, so both stacks
+return identical payloads.
+"""
+import logging
+import re
+from calendar import monthrange
+from datetime import date
+from http import HTTPStatus
+
+import asyncpg
+from sqlalchemy import bindparam, func, select
+from sqlalchemy.dialects import postgresql
+
+from core.config import (
+    JSON_BACKEND,
+    SQLALCHEMY_DATABASE_URI,
+    SQLALCHEMY_MAX_OVERFLOW,
+    SQLALCHEMY_PGBOUNCER,
+    SQLALCHEMY_POOL_SIZE,
+)
+from core.dumper import get_dumper
+from core.json import dumps, make_encoder
+from core.models.all import Merchant, Transaction, User
+
+
+logger = logging.getLogger(__name__)
+
+
+PER_PAGE = 50
+
+
+_dialect = postgresql.dialect(paramstyle="numeric")
+
+
+class Statement:
+    """
+    SQLAlchemy statement compiled once for asyncpg (`$n` placeholders).
+    """
+
+    def __init__(self, statement):
+        compiled = statement.compile(dialect=_dialect)
+
+        self.sql = re.sub(r"(?<!:):(\d+)", r"$\1", compiled.string)
+        self.positions = compiled.positiontup
+        self.defaults = {key: bind.value for key, bind in compiled.binds.items()}
+
+    def arguments(self, **params):
+        values = dict(self.defaults, **params)
+        return [values[key] for key in self.positions]
+
+    async def fetch(self, connection, **params):
+        return await connection.fetch(self.sql, *self.arguments(**params))
+
+    async def fetchval(self, connection, **params):
+        return await connection.fetchval(self.sql, *self.arguments(**params))
+
+
+def labelled(table):
+    return [column.label(f"{table.name}_{column.name}") for column in table.columns]
+
+
+def hydrate(model, row):
+    """
+    Build a transient `model` instance from a labelled row.
+    """
+    table = model.__table__
+
+    if row[f"{table.name}_id"] is None:
+        return None
+
+    values = {
+        column.key: row[f"{table.name}_{column.name}"] for column in table.columns
+    }
+
+    return model(**values)
+
+
+transaction_table = Transaction.__table__
+user_table = User.__table__
+merchant_table = Merchant.__table__
+
+# `Transaction.schema_class` embeds the related user and merchant.
+transaction_select = select(
+    labelled(transaction_table) + labelled(user_table) + labelled(merchant_table)
+).select_from(transaction_table.join(user_table).outerjoin(merchant_table))
+
+# Routes are keyed on the transaction foreign key they filter on.
+entities = dict(users=Transaction.user_id, merchants=Transaction.merchant_id)
+
+
+def list_statement(column):
+    return Statement(
+        transaction_select.where(column == bindparam("entity_id"))
+        # `id` breaks the ties of transactions executed the same day, pages are
+        # stable and the same as the Flask listings'.
+        .order_by(Transaction.executed_at, Transaction.id)
+        .limit(bindparam("limit"))
+        .offset(bindparam("offset"))
+    )
+
+
+def average_statement(column, monthly=False):
+    statement = select([func.avg(Transaction.amount)]).where(
+        column == bindparam("entity_id")
+    )
+
+    if monthly:
+        statement = statement.where(
+            Transaction.executed_at.between(bindparam("start"), bindparam("end"))
+        )
+
+    return Statement(statement)
+
+
+statements = {
+    entity: dict(
+        list=list_statement(column),
+        average=average_statement(column),
+        monthly_average=average_statement(column, monthly=True),
+    )
+    for entity, column in entities.items()
+}
+
+
+class NotFound(Exception):
+    pass
+
+
+async def list_transactions(connection, entity, entity_id, page=1):
+    if page < 1:
+        raise NotFound()
+
+    rows = await statements[entity]["list"].fetch(
+        connection,
+        entity_id=entity_id,
+        limit=PER_PAGE,
+        offset=(page - 1) * PER_PAGE,
+    )
+
+    if len(rows) == 0:
+        # Mirrors `Query.page`
+        if page != 1:
+            raise NotFound()
+
+        return "No transactions found."
+
+    users, merchants = {}, {}
+    transactions = []
+
+    for row in rows:
+        transaction = hydrate(Transaction, row)
+
+        user_id = transaction.user_id
+        if user_id not in users:
+            users[user_id] = hydrate(User, row)
+
+        merchant_id = transaction.merchant_id
+        if merchant_id not in merchants:
+            merchants[merchant_id] = hydrate(Merchant, row)
+
+        transaction.user = users[user_id]
+        transaction.merchant = merchants[merchant_id]
+
+        transactions.append(transaction)
+
+    return get_dumper(Transaction.schema_class.compiled())(transactions, many=True)
+
+
+async def average(connection, entity, entity_id, year=None, month=None):
+    if year is None or month is None:
+        return await statements[entity]["average"].fetchval(
+            connection, entity_id=entity_id
+        )
+
+    try:
+        num_days = monthrange(year, month)[1]
+
+    except Exception:
+        raise NotFound()
+
+    return await statements[entity]["monthly_average"].fetchval(
+        connection,
+        entity_id=entity_id,
+        start=date(year, month, 1),
+        end=date(year, month, num_days),
+    )
+
+
+routes = [
+    (
+        re.compile(
+            r"^/(?P<entity>users|merchants)/(?P<entity_id>[^/]+)/average"
+            r"(?:/(?P<year>\d+)/(?P<month>\d+))?/?$"
+        ),
+        average,
+    ),
+    (
+        re.compile(
+            r"^/(?P<entity>users|merchants)/(?P<entity_id>[^/]+)(?:/(?P<page>\d+))?/?$"
+        ),
+        list_transactions,
+    ),
+]
+
+
+def resolve(path):
+    for pattern, handler in routes:
+        match = pattern.match(path)
+
+        if match is None:
+            continue
+
+        kwargs = {key: value for key, value in match.groupdict().items() if value}
+
+        try:
+            kwargs["entity_id"] = int(kwargs["entity_id"])
+
+        except ValueError:
+            raise NotFound()
+
+        for key in ("page", "year", "month"):
+            if key in kwargs:
+                kwargs[key] = int(kwargs[key])
+
+        return handler, kwargs
+
+    raise NotFound()
+
+
+def error(status):
+    status = HTTPStatus(status)
+    return dict(error=dict(description=status.description)), status
+
+
+class App:
+    """
+    Minimal ASGI application, routes mirror the users and merchants blueprints.
+    The connection pool is opened by the server lifespan events.
+
+    With `pgbouncer` (transaction pooling) statements aren't cached: a named
+    prepared statement only exists on the server connection that prepared it.
+    """
+
+    health_check_path = "/health-check"
+
+    def __init__(
+        self,
+        dsn=SQLALCHEMY_DATABASE_URI,
+        json_backend=JSON_BACKEND,
+        pgbouncer=SQLALCHEMY_PGBOUNCER,
+        **pool_options,
+    ):
+        self.dsn = re.sub(r"^postgres(ql)?(\+\w+)?://", "postgresql://", dsn)
+        self.json_encoder = make_encoder(json_backend)
+
+        if pgbouncer:
+            pool_options.setdefault("statement_cache_size", 0)
+
+        self.pool_options = pool_options
+        self.pool = None
+
+    async def startup(self):
+        self.pool = await asyncpg.create_pool(self.dsn, **self.pool_options)
+
+    async def shutdown(self):
+        await self.pool.close()
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+
+            if message["type"] == "lifespan.startup":
+                await self.startup()
+                await send({"type": "lifespan.startup.complete"})
+
+            elif message["type"] == "lifespan.shutdown":
+                await self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def handle(self, scope):
+        if scope["method"] not in ("GET", "HEAD"):
+            return error(HTTPStatus.METHOD_NOT_ALLOWED)
+
+        path = scope["path"]
+
+        if path == self.health_check_path:
+            return dict(status="healthy"), HTTPStatus.OK
+
+        try:
+            handler, kwargs = resolve(path)
+
+            async with self.pool.acquire() as connection:
+                return await handler(connection, **kwargs), HTTPStatus.OK
+
+        except NotFound:
+            return error(HTTPStatus.NOT_FOUND)
+
+        except Exception:
+            logger.exception(f"Error handling {path}")
+            return error(HTTPStatus.INTERNAL_SERVER_ERROR)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self.lifespan(receive, send)
+
+        data, status = await self.handle(scope)
+        body = dumps(data, self.json_encoder).encode()
+
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"server", b"Test API"),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+
+app = App(
+    min_size=SQLALCHEMY_POOL_SIZE,
+    max_size=SQLALCHEMY_POOL_SIZE + SQLALCHEMY_MAX_OVERFLOW,
+)
@@ -1,24 +1,37 @@
 
 
-def test_empty_list_merchant_transactions(client):
-    response = client.get("/merchants/23")
+def test_empty_list_merchant_transactions(client, query_budget):
+    with query_budget(max_queries=1):
+        response = client.get("/merchants/23")
     assert response.status_code == 200
     assert response.json == "No transactions found."
 
 
-def test_list_merchant_transactions(client):
-    response = client.get("/merchants/40")
+def test_list_merchant_transactions(client, query_budget):
+    # Users and merchants are joined, rows aren't counted.
+    with query_budget(max_queries=1):
+        response = client.get("/merchants/40")
     assert response.status_code == 200
     assert len(response.json) != 0
+    assert "X-Total-Count" not in response.headers
 
 
-def test_merchant_average_basket(client):
-    response = client.get("/merchants/40/average")
+def test_merchant_average_basket(client, query_budget):
+    with query_budget(max_queries=1):
+        response = client.get("/merchants/40/average")
     assert response.status_code == 200
     # assert response.json == 50.159662
 
 
-def test_merchant_average_basket_per_month(client):
-    response = client.get("/merchants/40/average/2019/06")
+def test_merchant_average_basket_per_month(client, query_budget):
+    with query_budget(max_queries=1):
+        response = client.get("/merchants/40/average/2019/06")
     assert response.status_code == 200
     # assert response.json == 50.250841
+
+
+def test_list_merchant_transactions_total(client, query_budget):
+    with query_budget(max_queries=2):
+        response = client.get("/merchants/40?total=exact")
+    assert response.status_code == 200
+    assert response.headers["X-Total-Count"] == "10000"
@@ -5,8 +5,12 @@ from datetime import date
 from calendar import monthrange
 
 from . import users_api, users
+from core.dumper import get_dumper
 from core.models.all import Transaction
 from core.models.base import session
+from core.pagination import add_total, get_total, get_total_mode
+from core.schema import get_requested_fields
+from core.timing import timer
 
 
 @users_api.route('/<user_id>', defaults={'page': 1})
@@ -14,17 +18,21 @@ from core.models.base import session
 # @users_api.doc(params={'user_id': 'ID of the user'})
 class UserResource(Resource):
     def get(self, user_id, page):
-        transactions = session.query(Transaction)
-        transactions = transactions.filter(Transaction.user_id == user_id)
-        transactions = transactions.order_by(Transaction.executed_at).paginate(page=page, per_page=50).items
-        transactions_schema = Transaction.schema_class()
-        res = []
+        total_mode = get_total_mode()
+        # Shared dump schema, see `ModelSchema.compiled`.
+        schema_class = Transaction.schema_class
+        schema = schema_class.compiled(only=get_requested_fields(schema_class.compiled()))
+        listing = session.query(Transaction).filter(Transaction.user_id == user_id)
+        transactions = listing.load_fields(schema).eager_load(schema)
+        transactions = transactions.order_by(Transaction.executed_at, Transaction.id).page(page, per_page=50)
+        total = get_total(listing, total_mode, "user", user_id)
+        dump = get_dumper(schema)
         if len(transactions) != 0:
-            for transaction in transactions:
-                res.append(transactions_schema.dump(transaction).data)
-            return jsonify(res)
+            with timer("serialize"):
+                data = dump(transactions, many=True)
+            return add_total(jsonify(data), total_mode, total)
         else:
-            return jsonify('No transactions found.')
+            return add_total(jsonify('No transactions found.'), total_mode, total)
 
 
 @users_api.route('/<user_id>/average')
@@ -1,24 +1,70 @@
 
 
-def test_empty_list_user_transactions(client):
-    response = client.get("/users/2300")
+def test_empty_list_user_transactions(client, query_budget):
+    with query_budget(max_queries=1):
+        response = client.get("/users/2300")
     assert response.status_code == 200
     assert response.json == "No transactions found."
 
 
-def test_list_user_transactions(client):
-    response = client.get("/users/1")
+def test_list_user_transactions(client, query_budget):
+    # Users and merchants are joined, rows aren't counted.
+    with query_budget(max_queries=1):
+        response = client.get("/users/1")
     assert response.status_code == 200
     assert len(response.json) != 0
+    assert "X-Total-Count" not in response.headers
 
 
-def test_user_average_basket(client):
-    response = client.get("/users/1/average")
+def test_list_user_transactions_order(client):
+    # Many transactions share a date, `id` makes pages stable.
+    first, second = client.get("/users/1").json, client.get("/users/1/2").json
+    keys = [(item["executed_at"], item["id"]) for item in first + second]
+    assert keys == sorted(keys)
+    assert len(set(keys)) == 100
+
+
+def test_user_average_basket(client, query_budget):
+    with query_budget(max_queries=1):
+        response = client.get("/users/1/average")
     assert response.status_code == 200
     # assert response.json == 50.159662
 
 
-def test_user_average_basket_per_month(client):
-    response = client.get("/users/1/average/2019/06")
+def test_user_average_basket_per_month(client, query_budget):
+    with query_budget(max_queries=1):
+        response = client.get("/users/1/average/2019/06")
     assert response.status_code == 200
     # assert response.json == 50.250841
+
+
+def test_list_user_transactions_total(app, client, query_budget, monkeypatch, tmp_path):
+    with query_budget(max_queries=2):
+        response = client.get("/users/1/2?total=exact")
+    assert response.status_code == 200
+    assert response.headers["X-Total-Count"] == "10000"
+    assert response.headers["X-Total-Mode"] == "exact"
+
+    # Without analytics snapshot, the planner estimates it.
+    monkeypatch.setitem(app.config, "ANALYTICS_PATH", str(tmp_path))
+    response = client.get("/users/1?total=estimated")
+    assert response.headers["X-Total-Mode"] == "estimated"
+    assert 0 < int(response.headers["X-Total-Count"]) <= 20000
+
+    monkeypatch.setattr("core.pagination.rollup_count", lambda entity, id_: 9990)
+    with query_budget(max_queries=1):
+        response = client.get("/users/1?total=estimated")
+    assert response.headers["X-Total-Count"] == "9990"
+
+    response = client.get("/users/2300?total=exact")
+    assert response.json == "No transactions found."
+    assert response.headers["X-Total-Count"] == "0"
+
+    response = client.get("/users/1?total=all")
+    assert response.status_code == 400
+
+
+def test_list_user_transactions_pages(client):
+    assert client.get("/users/1/200").status_code == 200
+    assert client.get("/users/1/201").status_code == 404
+    assert client.get("/users/1/0").status_code == 404
@@ -1,13 +1,18 @@
 import logging
+import os
+from glob import glob
 
 from flask.json import dumps
 from flask.testing import FlaskClient
+from sqlalchemy import create_engine, text
 from core.config import SQLALCHEMY_TEST_DATABASE_URI
 
 from core.api.app import create_app
 from core.models.base import session as db_session
-from core.models.migrations.utils import drop, migrate
+from core.models.migrations.utils import drop, migrate, script
+from core.tests.database import clone_database
 from core.tests.fixtures import *  # noqa
+from data import merchant_name
 
 
 class Client(FlaskClient):
@@ -28,41 +33,29 @@ class Client(FlaskClient):
         return super().open(*args, headers=headers, **kwargs)
 
 
-@pytest.fixture(scope="session", autouse=True)
-def app(request, tmp_media_dir):
+TEMPLATE_SOURCES = (
+    __file__,
+    merchant_name.__file__,
+    *glob(os.path.join(script.versions, "*.py")),
+)
+
+
+def seed(uri):
     """
-    Create assets required by the test suites and expose the current
-    application.
+    Migrate and seed the template of the test databases.
     """
-    # Initialize the application
-    app = create_app(
-        dict(
-            TESTING=True,
-            SQLALCHEMY_DATABASE_URI=SQLALCHEMY_TEST_DATABASE_URI,
-            MEDIA_PATH=tmp_media_dir,
-            SERVER_NAME="domain.tld",
-        )
-    )
-    app.test_client_class = Client
-    context = app.app_context()
-    context.push()
-
-    # Drop existing schema
-    drop()
+    engine = create_engine(uri)
 
-    # Create the database schema
-    migrate(db_session.connection(), "head")
+    drop(engine)
 
-    db_session.commit()
+    with engine.begin() as connection:
+        migrate(connection, "head")
 
-    from core.models.all import Merchant, session
-    from core.models.all import db as _db
-    from data.merchant_name import merchant_names
-    for name in merchant_names:
-        Merchant(name=name).save()
-    session.commit()
+    engine.execute(
+        text("insert into merchant (name) select unnest(:names)"),
+        names=list(merchant_name.merchant_names),
+    )
 
-    engine = _db.engine
     insert_user = (
         f"""insert into "user" (email) select
                  concat('user', generate_series(1, 1000), '@test.com');"""
@@ -70,7 +63,6 @@ def app(request, tmp_media_dir):
     engine.execute(
         insert_user
     )
-    session.commit()
 
     insert_transaction = (
         f"""
@@ -92,7 +84,6 @@ def app(request, tmp_media_dir):
     engine.execute(
         insert_transaction
     )
-    session.commit()
 
     update_transaction = (
         """
@@ -105,7 +96,33 @@ def app(request, tmp_media_dir):
     engine.execute(
         update_transaction
     )
-    session.commit()
+    engine.execute("analyze")
+
+    engine.dispose()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def app(request, tmp_media_dir):
+    """
+    Clone the test database from its template and expose the current
+    application.
+    """
+    database_uri = clone_database(
+        SQLALCHEMY_TEST_DATABASE_URI, seed, TEMPLATE_SOURCES
+    )
+
+    # Initialize the application
+    app = create_app(
+        dict(
+            TESTING=True,
+            SQLALCHEMY_DATABASE_URI=database_uri,
+            MEDIA_PATH=tmp_media_dir,
+            SERVER_NAME="domain.tld",
+        )
+    )
+    app.test_client_class = Client
+    context = app.app_context()
+    context.push()
 
     yield app
 
@@ -1,9 +1,34 @@
 import logging
 
+from core.models.base import dispose_engine
+from core.perf.metrics import clear_metrics
+from core.perf.warmup import connect, warmup
+
 from .app import create_app
 
+try:
+    from uwsgidecorators import postfork
+except ImportError:
+    # Not running under uwsgi
+    postfork = None
+
 
 logging.basicConfig(level=logging.INFO)
 
 
 app = create_app()
+
+
+if postfork is not None:
+    if app.config["WARMUP_ENABLED"]:
+        warmup(app)
+
+    # Workers are forked from this process, forget the previous ones.
+    clear_metrics(app)
+
+    @postfork
+    def reset_engine():
+        dispose_engine(app)
+
+        if app.config["WARMUP_ENABLED"]:
+            connect(app)
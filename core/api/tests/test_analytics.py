@@ -0,0 +1,104 @@
+import os
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import func
+
+from core.analytics import Analytics, refresh
+from core.models.all import Transaction
+
+
+@pytest.fixture
+def analytics(session, tmp_path):
+    path = str(tmp_path)
+    refresh(path, session.connection())
+    return Analytics(path, check_interval=0)
+
+
+def expected_stats(session, column, entity_id, start=None, end=None):
+    query = session.query(func.count(), func.sum(Transaction.amount))
+    query = query.filter(column == entity_id)
+
+    if start is not None:
+        query = query.filter(Transaction.executed_at >= start)
+        query = query.filter(Transaction.executed_at < end)
+
+    count, total = query.one()
+    return count, int((total or 0) * 100)
+
+
+def test_stats(session, analytics):
+    for entity, column, entity_id in (
+        ("user", Transaction.user_id, 1),
+        ("merchant", Transaction.merchant_id, 40),
+        ("merchant", Transaction.merchant_id, 23),
+    ):
+        stats = analytics.stats(entity, entity_id)
+        count, total = expected_stats(session, column, entity_id)
+
+        assert (stats["count"], stats["total"]) == (count, total)
+
+
+def test_monthly(session, analytics):
+    series = analytics.monthly("user", 1)
+    count = analytics.stats("user", 1)["count"]
+    assert sum(month["count"] for month in series) == count
+
+    month = series[0]
+    year, month_ = map(int, month["month"].split("-"))
+    start = date(year, month_, 1)
+    end = date(year + month_ // 12, month_ % 12 + 1, 1)
+
+    stats = analytics.stats("user", 1, year, month_)
+    assert (stats["count"], stats["total"]) == (month["count"], month["total"])
+    assert (stats["count"], stats["total"]) == expected_stats(
+        session, Transaction.user_id, 1, start, end
+    )
+
+
+def test_incremental_refresh(session, analytics):
+    before = analytics.stats("merchant", 40)
+    meta = analytics.snapshot.meta
+
+    Transaction(
+        amount=Decimal("12.34"),
+        descriptor="TUI",
+        user_id=2,
+        merchant_id=40,
+        executed_at=date(2019, 6, 1),
+    ).save()
+
+    updated = refresh(analytics.path, session.connection())
+    assert updated["version"] == meta["version"] + 1
+    assert updated["rows"] == meta["rows"] + 1
+
+    after = analytics.stats("merchant", 40)
+    assert after["count"] == before["count"] + 1
+    assert after["total"] == before["total"] + 1234
+
+    assert analytics.top("merchant", 40)[-1] == dict(id=2, count=1, total=1234)
+    assert analytics.ranking("user", 1)[0]["id"] == 1
+
+
+def test_full_refresh(session, analytics):
+    first = analytics.snapshot
+    stats = analytics.stats("user", 1)
+
+    # Never rebuilt in place, the current snapshot stays readable.
+    meta = refresh(analytics.path, session.connection(), full=True)
+    assert meta["version"] == first.meta["version"] + 1
+    assert os.path.exists(os.path.join(first.path, "meta.json"))
+    assert analytics.stats("user", 1) == stats
+
+    second = analytics.snapshot
+
+    meta = refresh(analytics.path, session.connection(), full=True)
+    assert meta["version"] == first.meta["version"] + 2
+
+    # The replaced snapshot is kept, older ones are removed.
+    assert sorted(os.listdir(analytics.path)) == [
+        "current",
+        os.path.basename(second.path),
+        f"snapshot-{meta['version']}",
+    ]
@@ -0,0 +1,50 @@
+import pytest
+
+from core.models.pool import TimedNullPool, TimedQueuePool, pool_options
+
+
+def test_health_check_pool_stats(client):
+    response = client.get("/health-check")
+    assert response.status_code == 200
+    assert response.json["status"] == "healthy"
+
+    pool = response.json["pool"]
+    assert pool["pool"] == "TimedQueuePool"
+    assert pool["checkouts"] >= 0
+    assert "checkout_wait_max_ms" in pool
+
+
+def test_pool_options():
+    options = pool_options(
+        dict(
+            SQLALCHEMY_POOL_SIZE=2,
+            SQLALCHEMY_MAX_OVERFLOW=0,
+            SQLALCHEMY_POOL_PRE_PING=True,
+        )
+    )
+    assert options["poolclass"] is TimedQueuePool
+    assert options["pool_size"] == 2
+    assert options["max_overflow"] == 0
+    assert options["pool_pre_ping"] is True
+
+
+def test_pool_options_pgbouncer():
+    options = pool_options(dict(SQLALCHEMY_POOL_SIZE=2, SQLALCHEMY_PGBOUNCER=True))
+    assert options["poolclass"] is TimedNullPool
+    assert "pool_size" not in options
+
+
+def test_query_budget_exceeded(client, query_budget):
+    with pytest.raises(pytest.fail.Exception, match="2 queries executed, budget is 1"):
+        with query_budget(max_queries=1):
+            client.get("/users/1?total=exact")
+
+    with pytest.raises(pytest.fail.Exception, match="budget is 0ms"):
+        with query_budget(max_ms=0):
+            client.get("/users/1/average")
+
+    with query_budget(max_queries=1) as budget:
+        client.get("/users/1/average")
+
+    assert len(budget) == 1
+    assert "avg" in budget.statements[0]
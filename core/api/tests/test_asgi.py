@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+from core.api.asgi import App
+
+
+def call(app, path):
+    """
+    Run a single ASGI GET request and return `(status, body)`.
+    """
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": path, "headers": []}
+
+    asyncio.get_event_loop().run_until_complete(app(scope, receive, send))
+
+    start, body = messages
+    return start["status"], body["body"]
+
+
+@pytest.fixture(scope="module")
+def asgi_app(app):
+    asgi_app = App(app.config["SQLALCHEMY_DATABASE_URI"], min_size=1, max_size=1)
+
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(asgi_app.startup())
+    yield asgi_app
+    loop.run_until_complete(asgi_app.shutdown())
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "/users/1",
+        "/users/1/2",
+        "/users/2300",
+        "/users/1/average",
+        "/users/1/average/2019/06",
+        "/merchants/40",
+        "/merchants/23",
+        "/merchants/40/average",
+    ],
+)
+def test_same_payload_as_wsgi(client, asgi_app, path):
+    response = client.get(path)
+    status, body = call(asgi_app, path)
+
+    assert status == response.status_code
+    assert body == response.data
+
+
+def test_not_found(asgi_app):
+    status, _ = call(asgi_app, "/users/abc")
+    assert status == 404
+
+    status, _ = call(asgi_app, "/users/2300/2")
+    assert status == 404
+
+
+def test_pgbouncer_statement_cache(app, client):
+    assert "statement_cache_size" not in App(pgbouncer=False).pool_options
+
+    asgi_app = App(
+        app.config["SQLALCHEMY_DATABASE_URI"], pgbouncer=True, min_size=1, max_size=1
+    )
+    assert asgi_app.pool_options["statement_cache_size"] == 0
+
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(asgi_app.startup())
+
+    try:
+        status, body = call(asgi_app, "/users/1")
+
+    finally:
+        loop.run_until_complete(asgi_app.shutdown())
+
+    assert status == 200
+    assert body == client.get("/users/1").data
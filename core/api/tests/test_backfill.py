@@ -0,0 +1,141 @@
+from time import perf_counter
+
+import pytest
+from sqlalchemy import text
+
+from core.models.backfill import (
+    PROGRESS_TABLE,
+    BackfillError,
+    Throttle,
+    backfill,
+    backfills,
+    run_backfill,
+    sql_backfill,
+)
+from core.models.base import db
+
+
+@pytest.fixture
+def table(app):
+    """
+    Scratch table of 1000 rows, backfills commit their ranges.
+    """
+    engine = db.engine
+    engine.execute("create table backfilled (id serial primary key, value int)")
+    engine.execute("insert into backfilled (value) select generate_series(1, 1000)")
+
+    yield engine
+
+    engine.execute("drop table backfilled")
+    engine.execute(text(f"delete from {PROGRESS_TABLE} where name like 'test_%'"))
+
+    for name in [name for name in backfills if name.startswith("test_")]:
+        del backfills[name]
+
+
+def test_backfill_resumes(table):
+    failing = {500}
+
+    @backfill("test_double", "backfilled", chunk_size=100)
+    def double(connection, start, end):
+        if start in failing:
+            raise ValueError("Interrupted")
+
+        query = (
+            "update backfilled set value = value * 2 where id between :start and :end"
+        )
+        return connection.execute(text(query), start=start, end=end - 1).rowcount
+
+    with pytest.raises(ValueError):
+        run_backfill(table, "test_double", workers=2)
+
+    values = dict(table.execute("select id, value from backfilled").fetchall())
+    assert values[1] == 2
+    assert values[500] == 500 and values[599] == 599
+
+    done = table.execute(
+        text(f"select sum(rows) from {PROGRESS_TABLE} where name = 'test_double'")
+    ).scalar()
+    assert done == sum(value == id_ * 2 for id_, value in values.items())
+
+    failing.clear()
+    stats = run_backfill(table, "test_double", workers=2)
+
+    assert stats["chunks"] + stats["skipped"] == 11
+    assert stats["rows"] == 1000 - done
+
+    values = dict(table.execute("select id, value from backfilled").fetchall())
+    assert all(value == id_ * 2 for id_, value in values.items())
+
+
+def test_backfill_resume_chunk_size(app, table):
+    interrupted = [True]
+
+    @backfill("test_set", "backfilled", chunk_size=100)
+    def set_value(connection, start, end):
+        if start >= 500 and interrupted[0]:
+            raise ValueError("Interrupted")
+
+        query = "update backfilled set value = id * 2 where id >= :start and id < :end"
+        return connection.execute(text(query), start=start, end=end).rowcount
+
+    with pytest.raises(ValueError):
+        run_backfill(table, "test_set", workers=1)
+
+    interrupted[0] = False
+
+    # Range (0, 10000) would be skipped as its start is done.
+    with pytest.raises(BackfillError, match="ranges of 100 keys"):
+        run_backfill(table, "test_set", chunk_size=10000)
+
+    result = app.test_cli_runner().invoke(
+        args=["db", "backfill", "test_set", "--chunk-size", "10000"]
+    )
+    assert result.exit_code == 2
+    assert "ranges of 100 keys" in result.output
+
+    assert table.execute("select count(*) from backfilled where value = id").scalar()
+
+    result = app.test_cli_runner().invoke(
+        args=["db", "backfill", "test_set", "--chunk-size", "10000", "--restart"]
+    )
+    assert result.exit_code == 0, result.output
+    assert "1000 rows updated in 1 ranges (0 already done)" in result.output
+    assert not table.execute(
+        "select count(*) from backfilled where value != id * 2"
+    ).scalar()
+
+
+def test_backfill_command(app, table):
+    sql_backfill(
+        "test_increment",
+        "backfilled",
+        "update backfilled set value = value + 1 where id >= :start and id < :end",
+        chunk_size=300,
+    )
+    runner = app.test_cli_runner()
+
+    result = runner.invoke(args=["db", "backfill", "test_unknown"])
+    assert result.exit_code == 2
+    assert "test_increment" in result.output
+
+    result = runner.invoke(args=["db", "backfill", "test_increment"])
+    assert result.exit_code == 0, result.output
+    assert "1000 rows updated in 4 ranges (0 already done)" in result.output
+
+    result = runner.invoke(args=["db", "backfill", "test_increment"])
+    assert "0 rows updated in 0 ranges (4 already done)" in result.output
+
+    result = runner.invoke(args=["db", "backfill", "test_increment", "--restart"])
+    assert "1000 rows updated in 4 ranges" in result.output
+    assert table.execute("select sum(value) from backfilled").scalar() == 500500 + 2000
+
+
+def test_throttle():
+    throttle = Throttle(rate=1000)
+    start = perf_counter()
+
+    throttle.wait(100)
+    throttle.wait(100)
+
+    assert perf_counter() - start >= 0.19
@@ -0,0 +1,97 @@
+import gzip
+import zlib
+
+import pytest
+from flask import Flask, Response, jsonify
+
+from core.compression import compression, init_compression, negotiate
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        (None, None),
+        ("", None),
+        ("gzip", "gzip"),
+        ("deflate, gzip", "gzip"),
+        ("gzip;q=0.5, deflate", "deflate"),
+        ("gzip;q=0, deflate;q=0", None),
+        ("*", "gzip"),
+        ("*, gzip;q=0", "deflate"),
+        ("identity", None),
+    ],
+)
+def test_negotiate(header, expected):
+    assert negotiate(header, ["gzip", "deflate"]) == expected
+
+
+def test_listing_compressed(client):
+    plain = client.get("/users/1")
+    response = client.get("/users/1", headers={"Accept-Encoding": "gzip"})
+
+    assert plain.headers.get("Content-Encoding") is None
+    assert "Accept-Encoding" in plain.headers["Vary"]
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert int(response.headers["Content-Length"]) < len(plain.data)
+    assert gzip.decompress(response.data) == plain.data
+
+
+def test_small_body_not_compressed(client):
+    response = client.get("/health-check", headers={"Accept-Encoding": "gzip"})
+    assert response.headers.get("Content-Encoding") is None
+    assert response.json["status"] == "healthy"
+
+
+@pytest.fixture
+def compressed_app():
+    app = Flask(__name__)
+    app.config["COMPRESS_MIN_SIZE"] = 100
+    init_compression(app)
+
+    payload = [dict(id=index, descriptor="CARD PAYMENT") for index in range(100)]
+
+    @app.route("/stream")
+    def streamed():
+        def generate():
+            yield "["
+
+            for index, item in enumerate(payload):
+                yield ("," if index else "") + f'{{"id":{item["id"]}}}'
+
+            yield "]"
+
+        return Response(generate(), mimetype="application/json")
+
+    @app.route("/disabled")
+    @compression(enabled=False)
+    def disabled():
+        return jsonify(payload)
+
+    @app.route("/small")
+    @compression(min_size=0)
+    def small():
+        return jsonify([])
+
+    return app
+
+
+def test_streamed_response(compressed_app):
+    client = compressed_app.test_client()
+
+    plain = client.get("/stream")
+    response = client.get("/stream", headers={"Accept-Encoding": "deflate"})
+
+    assert response.headers["Content-Encoding"] == "deflate"
+    assert "Content-Length" not in response.headers
+    assert zlib.decompress(response.data) == plain.data
+
+
+def test_route_options(compressed_app):
+    client = compressed_app.test_client()
+    headers = {"Accept-Encoding": "gzip"}
+
+    assert client.get("/disabled", headers=headers).headers.get(
+        "Content-Encoding"
+    ) is None
+    assert client.get("/small", headers=headers).headers["Content-Encoding"] == "gzip"
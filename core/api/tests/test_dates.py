@@ -0,0 +1,87 @@
+import csv
+import os
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from marshmallow import ValidationError
+from pytz import utc
+
+from core.dates import parse_dates, parse_html5_date, parse_iso_date, parse_iso_datetime
+from core.models.all import Transaction
+
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), "../../../data/transaction.csv")
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("2019-05-16", date(2019, 5, 16)),
+        ("2019-5-6", date(2019, 5, 6)),
+    ],
+)
+def test_parse_iso_date(value, expected):
+    assert parse_iso_date(value) == expected
+    assert parse_html5_date(value) == expected
+
+
+@pytest.mark.parametrize("value", ["2019-16-05", "16/05/2019", ""])
+def test_parse_iso_date_invalid(value):
+    with pytest.raises(ValueError):
+        parse_iso_date(value)
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("2019-05-16", datetime(2019, 5, 16, tzinfo=utc)),
+        ("2019-05-16T10:30:00", datetime(2019, 5, 16, 10, 30, tzinfo=utc)),
+        ("2019-05-16T10:30:00Z", datetime(2019, 5, 16, 10, 30, tzinfo=utc)),
+        (
+            "2019-05-16T10:30:00+02:00",
+            datetime(2019, 5, 16, 10, 30, tzinfo=timezone(timedelta(hours=2))),
+        ),
+        # arrow fallback
+        ("2019-05-16T10:30:00.5Z", datetime(2019, 5, 16, 10, 30, 0, 500000, utc)),
+    ],
+)
+def test_parse_iso_datetime(value, expected):
+    assert parse_iso_datetime(value) == expected
+
+
+@pytest.mark.parametrize("value", ["2019", "2019-05-16Tfoo", "not a datetime"])
+def test_parse_iso_datetime_invalid(value):
+    with pytest.raises(ValueError):
+        parse_iso_datetime(value)
+
+
+def test_parse_dates():
+    assert parse_dates(["2019-16-05", "2019-16-05", "", "2019-01-12"], "ydm") == [
+        date(2019, 5, 16),
+        date(2019, 5, 16),
+        None,
+        date(2019, 12, 1),
+    ]
+
+    with pytest.raises(ValueError, match="row 1"):
+        parse_dates(["2019-05-16", "2019-16-05"])
+
+
+def test_parse_dates_transactions_csv():
+    with open(DATA_PATH) as file_:
+        values = [row[1] for row in csv.reader(file_)]
+
+    dates = parse_dates(values, "ydm")
+    assert len(dates) == len(values)
+    assert dates[0] == date(2019, 5, 16)
+
+
+def test_schema_date():
+    schema = Transaction.get_schema()
+    field = schema.fields["executed_at"]
+
+    assert field.deserialize("2019/05/16") == date(2019, 5, 16)
+
+    for value in ("2019-16-05", 20190516):
+        with pytest.raises(ValidationError):
+            field.deserialize(value)
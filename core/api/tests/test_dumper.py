@@ -0,0 +1,69 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from core.dumper import compile_dumper, get_dumper
+from core.json import dumps
+from core.models.all import Merchant, Transaction, User
+from core.models.base import Model
+
+
+def models():
+    return [
+        class_
+        for class_ in Model._decl_class_registry.values()
+        if hasattr(class_, "schema_class")
+    ]
+
+
+@pytest.mark.parametrize("model", models(), ids=lambda model: model.__name__)
+def test_same_output_as_dump(session, model):
+    schema = model.get_schema()
+    dump = compile_dumper(schema)
+    assert dump.source is not None
+
+    objs = session.query(model).order_by(model.id).limit(100).all()
+    assert len(objs) > 0
+
+    def expected(obj, many=False):
+        return dumps(schema.dump(obj, many=many, update_fields=False).data)
+
+    for obj in objs:
+        assert dumps(dump(obj)) == expected(obj)
+
+    assert dumps(dump(objs, many=True)) == expected(objs, many=True)
+
+
+def test_null_and_transient_values():
+    schema = Transaction.get_schema()
+    dump = get_dumper(schema)
+
+    transactions = [
+        Transaction(
+            id=1,
+            amount=Decimal("1.005"),
+            descriptor="TUI",
+            executed_at=date(2019, 6, 1),
+            user=User(id=1, email="user1@test.com"),
+            merchant=Merchant(id=40, name="TUI"),
+        ),
+        Transaction(id=2, amount=None, descriptor=None, executed_at=None),
+    ]
+
+    assert dumps(dump(transactions, many=True)) == dumps(
+        schema.dump(transactions, many=True).data
+    )
+
+
+def test_fallback():
+    schema = Transaction.get_schema()
+    dump = get_dumper(schema)
+
+    # Mappings are read by key, marshmallow handles them.
+    data = dict(id=1, descriptor="TUI")
+    assert dump(data) == schema.dump(data).data
+
+    # A converter failing reports like marshmallow.
+    transaction = Transaction(id=1, amount="not a number")
+    assert dump(transaction) == schema.dump(transaction, update_fields=False).data
@@ -0,0 +1,108 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+
+from core.dumper import get_dumper
+from core.models.all import Merchant, Transaction, User
+from core.models.base import db
+from core.schema import ModelSchema
+
+
+class UserTransactionsSchema(ModelSchema):
+    class Meta:
+        model = User
+        fields = ("id", "transactions")
+
+
+@pytest.fixture
+def statements():
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        if statement.startswith("SELECT"):
+            statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", count)
+    yield statements
+    event.remove(db.engine, "before_cursor_execute", count)
+
+
+@pytest.fixture
+def user(session):
+    user = User(email="eager@test.com")
+
+    for index in range(5):
+        Transaction(
+            descriptor=f"Merchant {index}",
+            amount=index,
+            executed_at=date(2019, 1, index + 1),
+            user=user,
+            merchant=Merchant(name=f"Merchant {index}"),
+        )
+
+    session.add(user)
+    session.flush()
+    session.expunge_all()
+
+    return user
+
+
+def test_eager_load_paths():
+    assert set(Transaction.get_schema().eager_load_paths()) == {
+        (Transaction.user.property,),
+        (Transaction.merchant.property,),
+    }
+
+    # Back references are not followed.
+    assert UserTransactionsSchema().eager_load_paths() == [
+        (User.transactions.property,),
+        (User.transactions.property, Transaction.merchant.property),
+    ]
+
+
+def test_listing_fixed_queries(client, user, statements):
+    response = client.get(f"/users/{user.id}")
+    assert response.status_code == 200
+    assert len(response.json) == 5
+    assert {item["merchant"]["name"] for item in response.json} == {
+        f"Merchant {index}" for index in range(5)
+    }
+
+    # Related rows are joined to the page query.
+    assert len(statements) == 1
+
+
+def test_collections_selectinload(session, user, statements):
+    schema = UserTransactionsSchema()
+
+    query = session.query(User).filter(User.id == user.id).eager_load(schema)
+    data = get_dumper(schema)(query.one())
+
+    assert len(data["transactions"]) == 5
+    assert len(statements) == 3
+
+
+def test_sparse_fieldset(client, user, statements):
+    response = client.get(f"/users/{user.id}?fields=id, amount,executed_at")
+    assert response.status_code == 200
+    assert [sorted(item) for item in response.json] == [
+        ["amount", "executed_at", "id"]
+    ] * 5
+
+    assert len(statements) == 1
+    assert "descriptor" not in statements[0]
+    assert "JOIN" not in statements[0]
+
+
+def test_sparse_fieldset_relationship(client, user, statements):
+    response = client.get(f"/users/{user.id}?fields=id,merchant")
+    assert response.status_code == 200
+    assert all(sorted(item) == ["id", "merchant"] for item in response.json)
+    assert len(statements) == 1
+
+
+def test_sparse_fieldset_unknown(client, user):
+    response = client.get(f"/users/{user.id}?fields=id,password")
+    assert response.status_code == 400
+    assert "password" in response.json["message"]
@@ -0,0 +1,89 @@
+import datetime
+import enum
+import json
+import uuid
+from decimal import Decimal
+
+import pytest
+
+from core.json import dumps, make_encoder
+from core.models.enum import DeclEnum
+
+
+class Color(enum.Enum):
+    red = "red"
+
+
+class Status(DeclEnum):
+    active = "active", "Active"
+
+
+payload = dict(
+    amount=Decimal("83.10"),
+    average=Decimal("50.2610810000000000"),
+    executed_at=datetime.date(2019, 6, 1),
+    created_at=datetime.datetime(2019, 6, 1, 12, 30, 15, 250),
+    id=uuid.UUID("c2b5a1f4-2b5e-4c8e-9a43-2f6a0e9c7d10"),
+    color=Color.red,
+    status=Status.active,
+    name="Café",
+    items=[1, None, True],
+)
+
+
+expected = dict(
+    amount=83.1,
+    average=50.261081,
+    executed_at="2019-06-01",
+    created_at="2019-06-01T12:30:15.000250",
+    id="c2b5a1f4-2b5e-4c8e-9a43-2f6a0e9c7d10",
+    color="red",
+    status="active",
+    name="Café",
+    items=[1, None, True],
+)
+
+
+@pytest.mark.parametrize("backend", ["simplejson", "orjson"])
+def test_backends(backend):
+    data = dumps(payload, make_encoder(backend))
+
+    assert json.loads(data) == expected
+    assert list(json.loads(data)) == sorted(expected)
+
+
+@pytest.mark.parametrize("backend", ["simplejson", "orjson"])
+def test_backends_wire_format(backend):
+    encoder = make_encoder(backend)
+
+    # Decimals are written exactly, not as floats.
+    data = dumps(
+        dict(amount=Decimal("83.10"), average=Decimal("50.2610810000000000")),
+        encoder,
+    )
+    assert data == '{"amount":83.10,"average":50.2610810000000000}\n'
+
+    data = dumps(dict(name="Café 🍕"), encoder)
+    assert data == '{"name":"Caf\\u00e9 \\ud83c\\udf55"}\n'
+
+
+@pytest.mark.parametrize("backend", ["simplejson", "orjson"])
+def test_backends_json_as_ascii(app, backend):
+    encoder = make_encoder(backend)
+    app.config["JSON_AS_ASCII"] = False
+
+    try:
+        assert dumps(dict(name="Café"), encoder) == '{"name":"Café"}\n'
+
+    finally:
+        app.config["JSON_AS_ASCII"] = True
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        make_encoder("unknown")
+
+
+def test_app_encoder(app):
+    assert app.json_encoder.backend.name == app.config["JSON_BACKEND"]
+    assert app.config["RESTFUL_JSON"]["cls"] is app.json_encoder
@@ -0,0 +1,89 @@
+import asyncio
+import json
+
+from core.perf.load import load, parse_mix, pool_wait_avg, saturation
+
+
+def test_parse_mix():
+    assert parse_mix(["/users/1=3", "/users/1/average", "/a=b=0.5"]) == (
+        ["/users/1", "/users/1/average", "/a=b"],
+        [3.0, 1.0, 0.5],
+    )
+
+
+def test_parse_mix_query_string():
+    assert parse_mix(
+        [
+            "/users/1?fields=id,amount",
+            "/users/1?fields=id,amount=2",
+            "/users/1?page=2",
+            "/users/1?total=exact&page=2=0.5",
+            "/users/1?fields=",
+        ]
+    ) == (
+        [
+            "/users/1?fields=id,amount",
+            "/users/1?fields=id,amount",
+            "/users/1?page=2",
+            "/users/1?total=exact&page=2",
+            "/users/1?fields=",
+        ],
+        [1.0, 2.0, 1.0, 0.5, 1.0],
+    )
+
+
+def test_pool_summary():
+    def pool(checked_out, checkouts, checkout_wait_ms):
+        return dict(
+            size=5,
+            max_overflow=10,
+            checked_out=checked_out,
+            checkouts=checkouts,
+            checkout_wait_ms=checkout_wait_ms,
+        )
+
+    samples = {1: pool(3, 10, 5), 2: pool(6, 30, 3), 3: dict(pool="TimedNullPool")}
+
+    assert saturation(samples) == 0.4
+    assert pool_wait_avg(samples) == 0.2
+    assert saturation({}) is None
+
+
+def test_load_fixed_concurrency():
+    paths = []
+    pool = dict(pid=1, size=5, max_overflow=10, checked_out=1)
+
+    async def handle(reader, writer):
+        request = await reader.readuntil(b"\r\n\r\n")
+        path = request.split(b" ")[1].decode()
+
+        if path == "/health-check":
+            status, body = "200 OK", json.dumps(dict(pool=pool)).encode()
+
+        else:
+            paths.append(path)
+            status, body = ("404 NOT FOUND" if path == "/missing" else "200 OK"), b"[]"
+
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+        writer.close()
+
+    loop = asyncio.get_event_loop()
+    server = loop.run_until_complete(asyncio.start_server(handle, "localhost", 0))
+    port = server.sockets[0].getsockname()[1]
+
+    try:
+        results, elapsed, samples = loop.run_until_complete(
+            load(f"http://localhost:{port}", ["/users/1=3", "/missing=1"], 200, 10)
+        )
+
+    finally:
+        server.close()
+        loop.run_until_complete(server.wait_closed())
+
+    assert len(results) == len(paths) == 200
+    assert set(paths) == {"/users/1", "/missing"}
+    assert sum(result.status == 404 for result in results) == paths.count("/missing")
+    assert samples == {1: pool}
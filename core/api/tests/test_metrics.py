@@ -0,0 +1,74 @@
+import os
+import re
+
+import pytest
+
+from core.perf.metrics import MmapValues, metric_key, read_values
+
+
+@pytest.fixture
+def metrics_dir(app, tmp_path):
+    previous = app.config["METRICS_DIR"]
+    app.config["METRICS_DIR"] = str(tmp_path)
+
+    yield str(tmp_path)
+
+    app.config["METRICS_DIR"] = previous
+
+
+def test_mmap_values(tmp_path):
+    path = str(tmp_path / "metrics-1.db")
+    values = MmapValues(path)
+    values.initial_size = 64
+
+    keys = [metric_key("requests_total", route=f"/route/{i}") for i in range(500)]
+
+    for index, key in enumerate(keys):
+        values.inc(key, index)
+
+    values.inc(keys[1], 0.5)
+    values.close()
+
+    expected = {key: float(index) for index, key in enumerate(keys)}
+    expected[keys[1]] = 1.5
+
+    assert dict(read_values(path)) == expected
+
+    # Reopened by a respawned process with the same pid.
+    values = MmapValues(path)
+    values.inc(keys[0])
+    assert values.get(keys[0]) == 1.0
+    values.close()
+
+
+def sample(text, name, le=None, **labels):
+    labels = sorted(labels.items()) + ([("le", le)] if le else [])
+    labels = ",".join(f'{key}="{value}"' for key, value in labels)
+    match = re.search(rf"^{re.escape(name)}{{{re.escape(labels)}}} (\S+)$", text, re.M)
+    return float(match.group(1)) if match else None
+
+
+def test_metrics_aggregated(client, metrics_dir):
+    # Another worker
+    other = MmapValues(os.path.join(metrics_dir, "metrics-1.db"))
+    other.inc(
+        metric_key(
+            "http_requests_total", route="/users/<user_id>", method="GET", status=200
+        ),
+        10,
+    )
+    other.close()
+
+    for _ in range(2):
+        assert client.get("/users/1").status_code == 200
+
+    text = client.get("/metrics").data.decode()
+
+    labels = dict(route="/users/<user_id>", method="GET")
+    assert sample(text, "http_requests_total", status=200, **labels) == 12
+    assert sample(text, "http_request_duration_seconds_count", **labels) == 2
+    bucket = sample(text, "http_request_duration_seconds_bucket", le="+Inf", **labels)
+    assert bucket == 2
+    assert sample(text, "http_request_db_queries_total", route=labels["route"]) >= 2
+    assert sample(text, "cache_hits_total", cache="compiled_schemas") > 0
+    assert "# TYPE http_request_duration_seconds histogram" in text
@@ -0,0 +1,144 @@
+import logging
+
+import pytest
+from alembic.environment import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from core.models.base import db
+from core.models.migrations.diff import describe
+from core.models.migrations.utils import (
+    DiffError,
+    add_constraint_not_valid,
+    check_revision,
+    create_index_concurrently,
+    format_progress,
+    swap_index_concurrently,
+)
+
+
+@pytest.fixture
+def scratch_database(app, monkeypatch):
+    # Scratch schemas go to the database of the current worker.
+    uri = app.config["SQLALCHEMY_DATABASE_URI"]
+    monkeypatch.setitem(app.config, "SQLALCHEMY_TEST_DATABASE_URI", uri)
+
+    yield
+
+    schemas = db.engine.execute(
+        text("select nspname from pg_namespace where nspname like 'check\\_%'")
+    )
+    assert schemas.fetchall() == []
+
+
+def test_describe(session):
+    facts = describe(session.connection(), "public")
+
+    assert "table transaction column amount NUMERIC(10, 2) not null" in facts
+    assert (
+        "table transaction foreign key transaction_user_id_fkey (user_id) -> user (id)"
+        in facts
+    )
+    assert "table transaction primary key transaction_pkey (id)" in facts
+    assert not any("alembic_version" in fact for fact in facts)
+    assert facts == sorted(facts)
+
+
+def test_check_revision(scratch_database):
+    with pytest.raises(DiffError) as error:
+        check_revision("head")
+
+    lines = error.value.lines
+    assert lines[:2] == ["--- metadata", "+++ migrations"]
+
+    changes = [line for line in lines[3:] if line[0] in "+-"]
+    assert "-table transaction index merchant_index (id, merchant_id)" in changes
+    assert "+table transaction index index_merchant (id, user_id)" in changes
+    assert all(" index " in line for line in changes)
+
+
+def test_check_revision_table_and_downgrade(scratch_database):
+    assert check_revision("head", table="user", step="d171c1f135e8") is True
+
+
+@pytest.fixture
+def op(app):
+    """
+    Operations of a migration running on a scratch table.
+    """
+    connection = db.engine.connect()
+    transaction = connection.begin()
+
+    connection.execute("create table online (id serial primary key, amount int)")
+    connection.execute("insert into online (amount) select generate_series(1, 1000)")
+
+    yield Operations(MigrationContext.configure(connection))
+
+    # The table was committed by the helpers.
+    transaction.rollback()
+    connection.execute("drop table if exists online")
+    connection.close()
+
+
+def get_indexes(op):
+    query = """
+        select indexname, indexdef from pg_indexes
+        where tablename = 'online' and indexname != 'online_pkey'
+    """
+    return dict(op.get_bind().execute(query).fetchall())
+
+
+def test_create_index_concurrently(op, caplog):
+    caplog.set_level(logging.INFO, logger="core.models.migrations.utils")
+
+    create_index_concurrently(op, "online_amount", "online", ["amount"])
+    assert "Index online_amount: done" in caplog.text
+
+    # The migration transaction is usable again.
+    assert op.get_bind().execute("select count(*) from online").scalar() == 1000
+
+    # An interrupted build left an invalid index.
+    op.execute(
+        "update pg_index set indisvalid = false "
+        "where indexrelid = 'online_amount'::regclass"
+    )
+    create_index_concurrently(op, "online_amount", "online", ["amount"], unique=True)
+
+    assert "CREATE UNIQUE INDEX online_amount" in get_indexes(op)["online_amount"]
+
+
+def test_swap_index_concurrently(op):
+    create_index_concurrently(op, "online_amount", "online", ["amount"])
+    swap_index_concurrently(op, "online_amount", "online", ["amount", "id"])
+
+    indexes = get_indexes(op)
+    assert list(indexes) == ["online_amount"]
+    assert indexes["online_amount"].endswith("(amount, id)")
+
+
+def test_add_constraint_not_valid(op):
+    add_constraint_not_valid(op, "online", "online_positive", "check (amount > 0)")
+
+    validated = op.get_bind().execute(
+        "select convalidated from pg_constraint where conname = 'online_positive'"
+    )
+    assert validated.scalar() is True
+
+    with pytest.raises(IntegrityError):
+        op.execute("insert into online (amount) values (-1)")
+
+
+def test_format_progress():
+    progress = dict(
+        phase="building index: scanning table",
+        blocks_done=25,
+        blocks_total=100,
+        tuples_done=0,
+        tuples_total=0,
+        lockers_done=0,
+        lockers_total=0,
+    )
+    assert format_progress(progress) == (
+        "building index: scanning table, 25/100 blocks (25%)"
+    )
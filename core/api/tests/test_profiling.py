@@ -0,0 +1,99 @@
+import os
+import pstats
+import sys
+import tracemalloc
+from time import time
+
+import pytest
+
+from core.perf.profiling import init_profiling, list_profiles, sign
+
+
+@pytest.fixture
+def profiles_dir(app, tmp_path):
+    path = str(tmp_path)
+    config = dict(
+        PROFILING_ENABLED=True,
+        PROFILING_DIR=path,
+        PROFILING_SECRET="secret",
+        PROFILING_SAMPLE_RATE=0.0,
+    )
+    previous = {key: app.config.get(key) for key in config}
+
+    app.config.update(config)
+    init_profiling(app)
+
+    yield path
+
+    app.config.update(previous)
+
+
+def test_profile_signed_request(client, profiles_dir):
+    response = client.get("/users/1/average")
+    assert "X-Profile-Id" not in response.headers
+    assert os.listdir(profiles_dir) == []
+
+    for signature in (
+        "invalid",
+        sign("other", "/users/1/average"),
+        sign("secret", "/users/1"),
+        # Expired, can't be replayed
+        sign("secret", "/users/1/average", time() - 301),
+    ):
+        response = client.get("/users/1/average", headers={"X-Profile": signature})
+        assert "X-Profile-Id" not in response.headers
+
+    response = client.get(
+        "/users/1/average",
+        headers={"X-Profile": sign("secret", "/users/1/average")},
+    )
+    assert response.status_code == 200
+
+    profile_id = response.headers["X-Profile-Id"]
+    assert sorted(os.listdir(profiles_dir)) == [
+        f"{profile_id}.json",
+        f"{profile_id}.prof",
+    ]
+
+    [meta] = list_profiles(profiles_dir)
+    assert meta["route"] == "/users/<user_id>/average"
+    assert meta["status"] == 200
+
+    stats = pstats.Stats(os.path.join(profiles_dir, f"{profile_id}.prof"))
+    assert any(function == "get" for _, _, function in stats.stats)
+
+
+def test_profile_sampled_with_allocations(app, client, profiles_dir):
+    app.config["PROFILING_SAMPLE_RATE"] = 1.0
+
+    for _ in range(2):
+        response = client.get("/users/1", headers={"X-Profile-Memory": "1"})
+        assert "X-Profile-Id" in response.headers
+
+    assert len(list_profiles(profiles_dir, "/users/<user_id>")) == 2
+    assert list_profiles(profiles_dir, "/merchants/<merchant_id>") == []
+
+    result = app.test_cli_runner().invoke(
+        args=["perf", "profiles", "--path", profiles_dir, "--limit", "5"]
+    )
+    assert result.exit_code == 0, result.output
+    assert "/users/<user_id>: 2 profiles" in result.output
+    assert "cumulative" in result.output
+    assert "Allocation sites:" in result.output
+
+
+def test_profile_failing_request(app, client, profiles_dir):
+    app.config["PROFILING_SAMPLE_RATE"] = 1.0
+
+    if "boom" not in app.view_functions:
+
+        @app.route("/boom")
+        def boom():
+            raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        client.get("/boom", headers={"X-Profile-Memory": "1"})
+
+    # Neither the profiler nor tracemalloc outlive the request.
+    assert sys.getprofile() is None
+    assert not tracemalloc.is_tracing()
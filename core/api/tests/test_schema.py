@@ -0,0 +1,88 @@
+from sqlalchemy import event
+
+from core.models.all import Merchant, Transaction, User
+from core.schema import clear_compiled_schemas, fetch_foreign_keys, get_class_by_table
+
+
+def test_compiled_schema_is_shared(app):
+    clear_compiled_schemas()
+
+    schema = Transaction.schema_class.compiled()
+    assert Transaction.schema_class.compiled() is schema
+    assert User.schema_class.compiled() is not schema
+
+    only = Transaction.schema_class.compiled(only=("id", "amount"))
+    assert only is not schema
+    assert Transaction.schema_class.compiled(only=["id", "amount"]) is only
+    assert sorted(only.fields) == ["amount", "id"]
+
+
+def test_get_schema_not_shared(app):
+    clear_compiled_schemas()
+    compiled = Transaction.schema_class.compiled()
+
+    # Load paths mutate their schema, they get their own.
+    schema = Transaction.get_schema()
+    assert schema is not compiled
+    assert Transaction.get_schema() is not schema
+
+    del schema.fields["amount"]
+    assert "amount" in Transaction.schema_class.compiled().fields
+
+
+def test_compiled_schema_per_method(app):
+    with app.test_request_context("/", method="GET"):
+        get_schema = Transaction.schema_class.compiled()
+
+    with app.test_request_context("/", method="POST"):
+        post_schema = Transaction.schema_class.compiled()
+
+    assert get_schema is not post_schema
+
+    with app.test_request_context("/", method="GET"):
+        assert Transaction.schema_class.compiled() is get_schema
+
+
+def test_compiled_schema_same_payload(client):
+    response = client.get("/users/1")
+    transaction = Transaction.query.get(response.json[0]["id"])
+
+    assert Transaction.schema_class().dump(transaction).data == (
+        Transaction.schema_class.compiled().dump(transaction).data
+    )
+
+
+def test_get_class_by_table():
+    assert get_class_by_table("transaction") is Transaction
+    assert get_class_by_table("merchant") is Merchant
+    assert get_class_by_table("unknown") is None
+
+
+def test_fetch_foreign_keys(app, session):
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        if statement.startswith("SELECT"):
+            statements.append(statement)
+
+    foreign_key = Merchant.__table__.c.id
+    engine = session.get_bind()
+    event.listen(engine, "before_cursor_execute", count)
+
+    try:
+        with app.app_context():
+            found = fetch_foreign_keys(foreign_key, ["40", "41", "100000"])
+            assert sorted(found) == ["40", "41"]
+            assert isinstance(found["40"], Merchant)
+            assert len(statements) == 1
+
+            # Cached for the request
+            fetch_foreign_keys(foreign_key, ["40", "41"])
+            assert len(statements) == 1
+
+        with app.app_context():
+            fetch_foreign_keys(foreign_key, ["40"])
+            assert len(statements) == 2
+
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
@@ -0,0 +1,87 @@
+import pytest
+
+from core.perf.slow_queries import init_slow_queries, read_records, summarize
+
+
+@pytest.fixture
+def slow_query_log(app, tmp_path):
+    path = str(tmp_path / "slow-queries.jsonl")
+    config = dict(
+        SLOW_QUERY_THRESHOLD=0,
+        SLOW_QUERY_SAMPLE_RATE=1.0,
+        SLOW_QUERY_LOG=path,
+    )
+    previous = {key: app.config.get(key) for key in config}
+
+    app.config.update(config)
+    init_slow_queries(app)
+
+    yield path
+
+    app.config.update(previous)
+
+
+def test_slow_queries_logged(client, slow_query_log):
+    response = client.get("/users/1/average")
+    assert response.status_code == 200
+
+    records = [
+        record
+        for record in read_records(slow_query_log)
+        if "avg" in record["statement"]
+    ]
+    assert len(records) == 1
+
+    record = records[0]
+    assert record["route"] == "users.user_average_resource_2"
+    assert record["parameters"] == {"user_id_1": "1"}
+    assert record["plan"]["Plan"]["Node Type"] == "Aggregate"
+    assert "Execution Time" in record["plan"]
+
+    # The session is still usable after the explain.
+    assert client.get("/users/1/average").json == response.json
+
+
+def test_slow_queries_command(app, client, slow_query_log):
+    for _ in range(3):
+        client.get("/merchants/40/average")
+
+    client.get("/users/1/average")
+
+    summary = summarize(read_records(slow_query_log))
+    counts = {item["statement"]: item["count"] for item in summary}
+    assert sorted(counts.values())[-1] == 3
+
+    result = app.test_cli_runner().invoke(args=["perf", "slow-queries", "--plan"])
+    assert result.exit_code == 0, result.output
+    assert "3 runs" in result.output
+    assert '"Node Type": "Aggregate"' in result.output
+
+
+def test_slow_queries_explain_side_effects(session, slow_query_log):
+    first = session.execute("select nextval('transaction_id_seq')").scalar()
+    second = session.execute("select nextval('transaction_id_seq')").scalar()
+
+    # The explain of the first `nextval()` didn't take a value.
+    assert second == first + 1
+
+    insert = """
+        with inserted as (
+            insert into merchant (name) values ('EXPLAINED') returning id
+        ) select count(*) from inserted
+    """
+    session.execute(insert)
+
+    assert (
+        session.execute("select count(*) from merchant where name = 'EXPLAINED'")
+        .scalar()
+        == 1
+    )
+
+    plans = {
+        record["statement"]: record["plan"]
+        for record in read_records(slow_query_log)
+    }
+    assert plans["select nextval('transaction_id_seq')"] is None
+    assert plans[insert] is None
+    assert plans["select count(*) from merchant where name = 'EXPLAINED'"]
@@ -0,0 +1,45 @@
+import json
+import re
+import subprocess
+import sys
+
+
+# Generous budgets, workers import `core.api.main` in about half of them.
+IMPORT_TIME_BUDGET = 2.0  # seconds
+MEMORY_BUDGET = 150 * 1024  # KiB of max resident memory
+
+LAZY_MODULES = ("schwifty", "pycountry", "iso3166", "alembic")
+
+SCRIPT = f"""
+import json, resource, sys
+
+import core.api.main
+
+print(json.dumps(dict(
+    maxrss=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    loaded=[name for name in {LAZY_MODULES!r} if name in sys.modules],
+)))
+"""
+
+
+def test_import_budget():
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", SCRIPT],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    result = json.loads(process.stdout.splitlines()[-1])
+
+    # `import time: self [us] | cumulative | imported package`
+    cumulative = re.search(
+        r"^import time:\s+\d+ \|\s+(\d+) \| core\.api\.main$",
+        process.stderr,
+        re.MULTILINE,
+    )
+    import_time = int(cumulative.group(1)) / 1e6
+
+    assert result["loaded"] == []
+    assert import_time < IMPORT_TIME_BUDGET
+    assert result["maxrss"] < MEMORY_BUDGET
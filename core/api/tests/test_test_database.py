@@ -0,0 +1,28 @@
+from sqlalchemy.engine.url import make_url
+
+from core.api.conftest import TEMPLATE_SOURCES
+from core.config import SQLALCHEMY_TEST_DATABASE_URI
+from core.tests.database import fingerprint, worker_database_name
+
+
+def test_fingerprint(tmp_path):
+    path = tmp_path / "0001_initial.py"
+    path.write_text("revision = '0001'")
+
+    key = fingerprint([str(path)])
+    assert key == fingerprint([str(path)])
+    assert len(key) == 12
+
+    path.write_text("revision = '0002'")
+    assert fingerprint([str(path)]) != key
+
+    assert any("versions" in path for path in TEMPLATE_SOURCES)
+
+
+def test_worker_database(app, monkeypatch):
+    monkeypatch.setenv("PYTEST_XDIST_WORKER", "gw3")
+    assert worker_database_name("postgresql://localhost/api_test") == "api_test_gw3"
+
+    # The session runs on the clone of its worker.
+    database = make_url(app.config["SQLALCHEMY_DATABASE_URI"]).database
+    assert database.startswith(make_url(SQLALCHEMY_TEST_DATABASE_URI).database + "_")
@@ -0,0 +1,89 @@
+import json
+import logging
+import re
+from time import perf_counter
+
+import pytest
+from sqlalchemy.exc import ProgrammingError
+
+from core.timing import get_timings, start_timings, timer
+
+
+def parse(header):
+    metrics = {}
+
+    for item in header.split(", "):
+        name, _, value = item.partition(";")
+        metrics[name] = value
+
+    return metrics
+
+
+def test_server_timing(client, query_budget):
+    with query_budget() as budget:
+        response = client.get("/users/1", headers={"Accept-Encoding": "gzip"})
+
+    metrics = parse(response.headers["Server-Timing"])
+
+    assert list(metrics) == [
+        "db",
+        "db-count",
+        "serialize",
+        "encode",
+        "compress",
+        "total",
+    ]
+    # The listing query only, no count. `db-count` also includes the
+    # savepoint of the `session` fixture, the budget doesn't.
+    assert len(budget) == 1
+    assert "count(" not in budget.statements[0].lower()
+    assert int(re.match(r'^desc="(\d+)"$', metrics["db-count"]).group(1)) == 2
+
+    for name in ("db", "serialize", "encode", "compress", "total"):
+        assert re.match(r"^dur=\d+\.\d$", metrics[name])
+
+
+def test_server_timing_log(app, client, caplog):
+    app.config["SERVER_TIMING_LOG"] = True
+
+    try:
+        with caplog.at_level(logging.INFO, logger="core.timing"):
+            client.get("/users/1/average")
+
+    finally:
+        app.config["SERVER_TIMING_LOG"] = False
+
+    line = json.loads(caplog.records[-1].getMessage())
+
+    assert line["path"] == "/users/1/average"
+    assert line["status"] == 200
+    assert line["db_count"] >= 1
+    assert line["db_ms"] <= line["total_ms"]
+
+
+def test_timer_outside_request():
+    with timer("serialize"):
+        pass
+
+
+def test_timing_failed_statement(app, session):
+    session.connection()
+
+    with app.test_request_context():
+        start_timings()
+
+        for _ in range(3):
+            with pytest.raises(ProgrammingError):
+                with session.begin_nested():
+                    session.execute("select * from missing_table")
+
+        session.execute("select 1")
+        timings = get_timings()
+        elapsed = perf_counter() - timings.start
+
+        # `SAVEPOINT` and `ROLLBACK TO SAVEPOINT` per failed statement and
+        # `select 1`, the failed statements aren't counted.
+        assert timings.db_count == 3 * 2 + 1
+
+        # No duration measured from the start of another statement.
+        assert timings.durations["db"] <= elapsed
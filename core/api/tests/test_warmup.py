@@ -0,0 +1,25 @@
+from core.models.all import Merchant
+from core.perf.warmup import WARMUP_PATHS, warmup
+from core.schema import clear_compiled_schemas, compiled_schemas_info
+
+
+def test_warmup(app):
+    clear_compiled_schemas()
+    merchant = Merchant.query.filter_by(name="TUI").one()
+
+    results = warmup(app, dispose=False, freeze=False)
+
+    assert len(results) == len(WARMUP_PATHS)
+    assert "/users/1" in results
+    assert f"/merchants/{merchant.id}/average" in results
+    assert {status for status, _ in results.values()} == {200}
+    assert compiled_schemas_info()["size"] > 0
+
+
+def test_warmup_failed_request(app):
+    results = warmup(
+        app, paths=("/users/{user_id}/average", "/unknown"), dispose=False, freeze=False
+    )
+
+    assert results["/users/1/average"][0] == 200
+    assert results["/unknown"][0] == 404
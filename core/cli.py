@@ -2,15 +2,12 @@ import click
 import json
 
 from core.models.base import db as database, session as db_session
-from core.models.migrations.utils import (
-    check_revision,
-    drop as drop_schema,
-    migrate as migrate_schema,
-)
 
 
 def init_cli(app):
     init_cli_db(app)
+    init_cli_analytics(app)
+    init_cli_perf(app)
 
 
 def init_cli_db(app):
@@ -27,9 +24,15 @@ def init_cli_db(app):
         """
         Ensure metadata and migrations are up to date.
         """
-        result = check_revision("head", table)
+        from core.models.migrations.utils import DiffError, check_revision
 
-        if result is True:
+        try:
+            check_revision("head", table)
+
+        except DiffError as error:
+            result = error.lines
+
+        else:
             return click.echo("Ok")
 
         for line in result:
@@ -50,6 +53,8 @@ def init_cli_db(app):
         """
         Upgrade database schema from migration scripts.
         """
+        from core.models.migrations.utils import migrate as migrate_schema
+
         migrate_schema(db_session.connection(), revision)
         db_session.commit()
 
@@ -58,6 +63,8 @@ def init_cli_db(app):
         """
         Drop database schema and user defined types.
         """
+        from core.models.migrations.utils import drop as drop_schema
+
         drop_schema()
 
     @db.command()
@@ -103,15 +110,178 @@ def init_cli_db(app):
         )
         session.commit()
 
-        update_transaction = (
-            """
-            update transaction
-                set merchant_id = merchant.id
-                from merchant
-                    where transaction.descriptor = merchant.name;
-            """
+        from core.models.backfill import reset_backfill, run_backfill
+
+        reset_backfill(engine, "transaction_merchant")
+        run_backfill(engine, "transaction_merchant")
+
+    @db.command()
+    @click.argument("name")
+    @click.option("--workers", default=4, type=int)
+    @click.option("--rate", type=float, help="Maximum rows per second.")
+    @click.option("--chunk-size", type=int, help="Keys per range.")
+    @click.option("--restart", is_flag=True, help="Forget previous runs.")
+    def backfill(name, workers, rate, chunk_size, restart):
+        """
+        Run a backfill by primary key ranges, resuming interrupted runs.
+        """
+        from core.models.backfill import (
+            BackfillError,
+            backfills,
+            reset_backfill,
+            run_backfill,
         )
-        engine.execute(
-            update_transaction
+
+        if name not in backfills:
+            raise click.BadParameter(
+                f"choose from {', '.join(sorted(backfills))}", param_hint="name"
+            )
+
+        if restart:
+            reset_backfill(database.engine, name)
+
+        try:
+            stats = run_backfill(database.engine, name, workers, rate, chunk_size)
+
+        except BackfillError as error:
+            raise click.BadParameter(str(error), param_hint="--chunk-size")
+
+        click.echo(
+            f"{stats['rows']} rows updated in {stats['chunks']} ranges "
+            f"({stats['skipped']} already done) in {stats['duration']:.1f}s"
         )
-        session.commit()
+
+
+def init_cli_analytics(app):
+    @app.cli.group()
+    def analytics():
+        """
+        Transactions columnar snapshot commands.
+        """
+        return
+
+    @analytics.command()
+    @click.option("--full", is_flag=True, help="Rebuild from scratch.")
+    @click.option("--chunk-size", default=100000, type=int)
+    def refresh(full, chunk_size):
+        """
+        Load new transactions into the analytics snapshot.
+        """
+        from core.analytics import refresh as refresh_snapshot
+
+        meta = refresh_snapshot(
+            app.config["ANALYTICS_PATH"], db_session.connection(), full, chunk_size
+        )
+        click.echo(json.dumps(meta))
+
+
+def init_cli_perf(app):
+    @app.cli.group()
+    def perf():
+        """
+        Performance investigation commands.
+        """
+        return
+
+    @perf.command("slow-queries")
+    @click.option("--path", help="Defaults to SLOW_QUERY_LOG.")
+    @click.option("--limit", default=10, type=int)
+    @click.option("--plan", is_flag=True, help="Show the plan of the slowest run.")
+    def slow_queries(path, limit, plan):
+        """
+        Summarize the slow query log, by total time.
+        """
+        from core.perf.slow_queries import read_records, summarize
+
+        path = path or app.config["SLOW_QUERY_LOG"]
+
+        for item in summarize(read_records(path), limit):
+            click.echo(
+                f"{item['total_ms']:.1f}ms total, {item['count']} runs, "
+                f"avg {item['average_ms']:.1f}ms, max {item['max_ms']:.1f}ms "
+                f"({', '.join(item['routes'])})"
+            )
+            click.echo(f"  {item['statement'][:500]}")
+
+            worst = item["worst"]
+
+            if plan and worst["plan"] is not None:
+                click.echo(f"  parameters: {worst['parameters']}")
+                click.echo(json.dumps(worst["plan"], indent=2))
+
+    @perf.command()
+    @click.option("--url", help="Target a running server instead of starting uwsgi.")
+    @click.option("--port", default=5050, type=int)
+    @click.option("--processes", type=int, help="Defaults to the uwsgi.ini value.")
+    @click.option("--harakiri", type=int, help="uwsgi harakiri timeout in seconds.")
+    @click.option("--requests", default=2000, type=int)
+    @click.option("--concurrency", default=50, type=int)
+    @click.option("--rate", type=float, help="Requests per second, open loop.")
+    @click.option(
+        "--path",
+        "mix",
+        multiple=True,
+        type=str,
+        help="`path[=weight]`, repeat to build the request mix.",
+    )
+    def load(url, port, processes, harakiri, requests, concurrency, rate, mix):
+        """
+        Load test the uwsgi deployment with a weighted request mix.
+        """
+        from core.perf.load import DEFAULT_MIX, run_load
+
+        stats = run_load(
+            mix=mix or DEFAULT_MIX,
+            requests=requests,
+            concurrency=None if rate else concurrency,
+            rate=rate,
+            port=port,
+            processes=processes,
+            url=url,
+            harakiri=harakiri,
+        )
+        click.echo(json.dumps(stats, indent=2))
+
+    @perf.command()
+    @click.option("--path", help="Defaults to PROFILING_DIR.")
+    @click.option("--route", help="Only the profiles of this url rule.")
+    @click.option("--sort", default="cumulative", help="pstats sort key.")
+    @click.option("--limit", default=20, type=int)
+    def profiles(path, route, sort, limit):
+        """
+        Summarize request profiles per route.
+        """
+        from core.perf.profiling import (
+            list_profiles,
+            summarize_allocations,
+            summarize_functions,
+        )
+
+        path = path or app.config["PROFILING_DIR"]
+        by_route = {}
+
+        for meta in list_profiles(path, route):
+            by_route.setdefault(meta["route"], []).append(meta)
+
+        for route_, profiles_ in sorted(by_route.items()):
+            durations = sorted(meta["duration_ms"] for meta in profiles_)
+
+            click.secho(
+                f"{route_}: {len(profiles_)} profiles, "
+                f"median {durations[len(durations) // 2]:.1f}ms, "
+                f"max {durations[-1]:.1f}ms",
+                bold=True,
+            )
+            click.echo(summarize_functions(path, profiles_, sort, limit))
+
+            allocations = summarize_allocations(path, profiles_, limit)
+
+            if allocations:
+                click.echo("Allocation sites:")
+
+            for site, total in allocations:
+                click.echo(
+                    f"  {total['size_diff'] / 1024:.1f}KiB "
+                    f"{total['count_diff']} blocks "
+                    f"({total['requests']} requests) {site}"
+                )
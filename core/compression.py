@@ -0,0 +1,215 @@
+"""
+`Accept-Encoding` negotiated response compression.
+
+Responses are compressed by an `after_request` hook (`init_compression`)
+with gzip, deflate or brotli when the `brotli` package is installed.
+Buffered bodies smaller than `COMPRESS_MIN_SIZE` are sent as is, streamed
+bodies are compressed chunk by chunk and flushed after each chunk so
+clients still receive them incrementally.
+
+Routes can override the application settings with `compression`:
+
+    @api.route("/export")
+    @compression(min_size=0, level=9)
+    class ExportResource(Resource):
+        ...
+
+    @compression(enabled=False)
+    def health_check():
+        ...
+"""
+import zlib
+
+from flask import current_app, request
+
+from core.timing import timer
+
+
+try:
+    import brotli
+
+except ImportError:  # pragma: no cover
+    brotli = None
+
+
+class ZlibCompressor:
+    def __init__(self, level, wbits):
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, wbits)
+
+    def compress(self, data):
+        return self.compressor.compress(data)
+
+    def flush(self):
+        return self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self.compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliCompressor:
+    def __init__(self, level):
+        # Brotli qualities go from 0 to 11.
+        self.compressor = brotli.Compressor(quality=min(level, 11))
+
+    def compress(self, data):
+        return self.compressor.process(data)
+
+    def flush(self):
+        return self.compressor.flush()
+
+    def finish(self):
+        return self.compressor.finish()
+
+
+# Ordered by preference when the client weights them equally.
+encodings = dict(
+    gzip=lambda level: ZlibCompressor(level, 16 + zlib.MAX_WBITS),
+    deflate=lambda level: ZlibCompressor(level, zlib.MAX_WBITS),
+)
+
+if brotli is not None:
+    encodings = dict(br=BrotliCompressor, **encodings)
+
+
+def negotiate(accept_encoding, available=None):
+    """
+    Pick the encoding preferred by the `Accept-Encoding` header value,
+    `None` when no compression is acceptable.
+    """
+    available = list(encodings if available is None else available)
+    weights = {}
+
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+
+        if not coding:
+            continue
+
+        weight = 1.0
+        params = params.strip()
+
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+
+            except ValueError:
+                weight = 0.0
+
+        weights[coding] = weight
+
+    default = weights.get("*", 0.0)
+    candidates = [
+        (weights.get(coding, default), -index, coding)
+        for index, coding in enumerate(available)
+    ]
+    weight, _, coding = max(candidates, default=(0.0, 0, None))
+
+    return coding if weight > 0 else None
+
+
+def compression(**options):
+    """
+    Override the compression settings (`enabled`, `min_size`, `level`)
+    of a view function or resource class.
+    """
+
+    def decorator(view):
+        view.compression = options
+        return view
+
+    return decorator
+
+
+def get_options(app, endpoint):
+    config = app.config
+
+    options = dict(
+        enabled=config.get("COMPRESS_ENABLED", True),
+        min_size=config.get("COMPRESS_MIN_SIZE", 1024),
+        level=config.get("COMPRESS_LEVEL", 6),
+        mimetypes=config.get("COMPRESS_MIMETYPES", ("application/json",)),
+    )
+
+    view = app.view_functions.get(endpoint)
+
+    for target in (getattr(view, "view_class", None), view):
+        overrides = getattr(target, "compression", None)
+
+        if overrides is not None:
+            options.update(overrides)
+            break
+
+    return options
+
+
+def stream(iterable, compressor):
+    try:
+        for chunk in iterable:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+
+            data = compressor.compress(chunk)
+
+            if chunk:
+                data += compressor.flush()
+
+            if data:
+                yield data
+
+        yield compressor.finish()
+
+    finally:
+        if hasattr(iterable, "close"):
+            iterable.close()
+
+
+def compress_response(response):
+    options = get_options(current_app, request.endpoint)
+
+    if not options["enabled"]:
+        return response
+
+    if (
+        response.status_code < 200
+        or response.status_code in (204, 304)
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in options["mimetypes"]
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+
+    encoding = negotiate(request.headers.get("Accept-Encoding"))
+
+    if encoding is None:
+        return response
+
+    compressor = encodings[encoding](options["level"])
+
+    if response.is_streamed:
+        length = response.content_length
+
+        if length is not None and length < options["min_size"]:
+            return response
+
+        response.direct_passthrough = False
+        response.response = stream(response.response, compressor)
+        response.headers.pop("Content-Length", None)
+
+    else:
+        data = response.get_data()
+
+        if len(data) < options["min_size"]:
+            return response
+
+        with timer("compress"):
+            response.set_data(compressor.compress(data) + compressor.finish())
+
+    response.headers["Content-Encoding"] = encoding
+
+    return response
+
+
+def init_compression(app):
+    app.after_request(compress_response)
@@ -5,6 +5,15 @@ def _environ_bool(var, default="false"):
     return environ.get(var, default).lower() == "true"
 
 
+def _environ_number(var, default=None, type_=int):
+    value = environ.get(var)
+
+    if value is None:
+        return default
+
+    return type_(value)
+
+
 SERVER_NAME = environ["SERVER_NAME"]
 
 # Bypass origin check
@@ -18,9 +27,66 @@ PREFERRED_URL_SCHEME = "https"
 
 PROPAGATE_EXCEPTIONS = True
 
+# JSON encoding backend: `orjson` or `simplejson` (Flask default)
+JSON_BACKEND = environ.get("JSON_BACKEND", "orjson")
+
+# Server-Timing header with database, serialization and encoding durations
+SERVER_TIMING = _environ_bool("SERVER_TIMING", "true")
+# Also log them as one JSON line per request
+SERVER_TIMING_LOG = _environ_bool("SERVER_TIMING_LOG")
+
+# Response compression, see `core.compression`
+COMPRESS_ENABLED = _environ_bool("COMPRESS_ENABLED", "true")
+# Buffered responses below this many bytes are sent uncompressed
+COMPRESS_MIN_SIZE = _environ_number("COMPRESS_MIN_SIZE", 1024)
+COMPRESS_LEVEL = _environ_number("COMPRESS_LEVEL", 6)
+
 SQLALCHEMY_TRACK_MODIFICATIONS = False
 SQLALCHEMY_DATABASE_URI = environ["SQLALCHEMY_DATABASE_URI"]
 SQLALCHEMY_TEST_DATABASE_URI = environ.get(
     "SQLALCHEMY_TEST_DATABASE_URI", f"{SQLALCHEMY_DATABASE_URI}_test"
 )
 SQLALCHEMY_ECHO = _environ_bool("SQLALCHEMY_ECHO")
+
+# Connection pool, one per uwsgi worker. Keep
+# `processes * (SQLALCHEMY_POOL_SIZE + SQLALCHEMY_MAX_OVERFLOW)`
+# below postgres `max_connections`.
+SQLALCHEMY_POOL_SIZE = _environ_number("SQLALCHEMY_POOL_SIZE", 5)
+SQLALCHEMY_MAX_OVERFLOW = _environ_number("SQLALCHEMY_MAX_OVERFLOW", 10)
+SQLALCHEMY_POOL_TIMEOUT = _environ_number("SQLALCHEMY_POOL_TIMEOUT", 10)
+SQLALCHEMY_POOL_RECYCLE = _environ_number("SQLALCHEMY_POOL_RECYCLE", 1800)
+SQLALCHEMY_POOL_PRE_PING = _environ_bool("SQLALCHEMY_POOL_PRE_PING", "true")
+# Log checkouts waiting longer than this many milliseconds
+SQLALCHEMY_POOL_SLOW_CHECKOUT = _environ_number(
+    "SQLALCHEMY_POOL_SLOW_CHECKOUT", 100, float
+)
+# Connect through pgbouncer in transaction pooling mode
+SQLALCHEMY_PGBOUNCER = _environ_bool("SQLALCHEMY_PGBOUNCER")
+
+# Prometheus `/metrics`, aggregated across workers through files in `METRICS_DIR`
+METRICS_ENABLED = _environ_bool("METRICS_ENABLED", "true")
+METRICS_DIR = environ.get("METRICS_DIR", "/tmp/metrics")
+
+# Warm the application up in the uwsgi master, see `core.perf.warmup`
+WARMUP_ENABLED = _environ_bool("WARMUP_ENABLED", "true")
+
+# Per request profiling, see `core.perf.profiling`
+PROFILING_ENABLED = _environ_bool("PROFILING_ENABLED")
+PROFILING_DIR = environ.get("PROFILING_DIR", "/tmp/profiles")
+# Key of the `X-Profile` header signatures
+PROFILING_SECRET = environ.get("PROFILING_SECRET")
+# Seconds a signature stays valid, limits replays
+PROFILING_SIGNATURE_MAX_AGE = _environ_number("PROFILING_SIGNATURE_MAX_AGE", 300)
+PROFILING_SAMPLE_RATE = _environ_number("PROFILING_SAMPLE_RATE", 0.0, float)
+PROFILING_TRACEMALLOC = _environ_bool("PROFILING_TRACEMALLOC")
+
+# Log statements slower than this many milliseconds, see `core.perf.slow_queries`
+SLOW_QUERY_THRESHOLD = _environ_number("SLOW_QUERY_THRESHOLD", None, float)
+# Share of slow `SELECT` statements explained with `EXPLAIN ANALYZE`
+SLOW_QUERY_SAMPLE_RATE = _environ_number("SLOW_QUERY_SAMPLE_RATE", 0.1, float)
+SLOW_QUERY_LOG = environ.get("SLOW_QUERY_LOG", "/tmp/slow-queries.jsonl")
+SLOW_QUERY_LOG_MAX_BYTES = _environ_number("SLOW_QUERY_LOG_MAX_BYTES", 10 * 1024 ** 2)
+SLOW_QUERY_LOG_BACKUP_COUNT = _environ_number("SLOW_QUERY_LOG_BACKUP_COUNT", 5)
+
+# Transactions columnar snapshot, see `core.analytics`
+ANALYTICS_PATH = environ.get("ANALYTICS_PATH", "/tmp/analytics")
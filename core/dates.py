@@ -1,14 +1,70 @@
 from datetime import date, datetime, timedelta
+from functools import lru_cache
 
-from arrow.parser import DateTimeParser, ParserError
 from pytz import utc
 
 
-_parser = DateTimeParser()
+# Parsed values are immutable, repeated strings are only parsed once.
+_cache_size = 4096
+
+
+@lru_cache(maxsize=_cache_size)
+def parse_iso_date(value):
+    """
+    Parse a `YYYY-MM-DD` date, month and day may not be zero padded.
+    """
+    try:
+        return date.fromisoformat(value)
+
+    except (TypeError, ValueError):
+        return datetime.strptime(value, "%Y-%m-%d").date()
 
 
 def parse_html5_date(value):
-    return date(*value.split("-"))
+    return parse_iso_date(value)
+
+
+# Position of the year, month and day in a date column
+DATE_ORDERS = dict(ymd=(0, 1, 2), ydm=(0, 2, 1), dmy=(2, 1, 0))
+
+
+def parse_dates(values, order="ymd", separator="-"):
+    """
+    Parse a column of dates written in `order` (e.g. `ydm` for the
+    `YYYY-DD-MM` dates of `data/transaction.csv`). Each distinct string
+    is parsed once. Empty values are returned as `None`.
+    """
+    year, month, day = DATE_ORDERS[order]
+    parsed = {}
+    dates = []
+
+    for index, value in enumerate(values):
+        try:
+            dates.append(parsed[value])
+            continue
+
+        except KeyError:
+            pass
+
+        if not value:
+            result = None
+
+        else:
+            try:
+                parts = value.strip().split(separator)
+
+                if len(parts) != 3:
+                    raise ValueError()
+
+                result = date(int(parts[year]), int(parts[month]), int(parts[day]))
+
+            except ValueError:
+                raise ValueError(f"Invalid date {value!r} at row {index}") from None
+
+        parsed[value] = result
+        dates.append(result)
+
+    return dates
 
 
 def to_utc(dt):
@@ -32,24 +88,59 @@ def parse_iso_datetime(value, timezone=None):
     """
     Parse ISO 8601 datetime.
     """
-    try:
-        if len(value) < 10:
-            raise ParserError()
+    if len(value) < 10:
+        raise ValueError("Invalid datetime format")
+
+    value = _parse_iso_datetime(value)
+
+    if timezone is not None:
+        value = timezone.localize(value)
 
-        value = _parser.parse_iso(value)
+    if value.tzinfo is None:
+        return to_utc(value)
 
-        if timezone is not None:
-            value = timezone.localize(value)
+    return value
 
-        if value.tzinfo is None:
-            return to_utc(value)
 
-        return value
+@lru_cache(maxsize=_cache_size)
+def _parse_iso_datetime(value):
+    try:
+        return datetime.fromisoformat(
+            value[:-1] + "+00:00" if value.endswith("Z") else value
+        )
+
+    except ValueError:
+        pass
+
+    from arrow.parser import ParserError
+
+    try:
+        return _arrow_parser().parse_iso(value)
 
     except ParserError as exc:
         raise ValueError("Invalid datetime format") from exc
 
 
+@lru_cache(maxsize=None)
+def _arrow_parser():
+    """
+    Fallback parser, arrow is only imported for formats Python can't parse.
+    """
+    from arrow.parser import DateTimeParser
+
+    return DateTimeParser()
+
+
+def cache_info():
+    """
+    Memoization statistics of the parsers.
+    """
+    return dict(
+        parse_iso_date=parse_iso_date.cache_info(),
+        parse_iso_datetime=_parse_iso_datetime.cache_info(),
+    )
+
+
 def format_iso_datetime(datetime_):
     """
     Format datetime as ISO 8601
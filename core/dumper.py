@@ -0,0 +1,279 @@
+"""
+Specialized serializers generated from `ModelSchema` instances.
+
+`schema.dump` walks the field objects of the schema for every object:
+accessor lookups, `Field.serialize` and `_serialize` calls and error
+collection. `compile_dumper` generates (`exec`) a function reading each
+attribute directly and inlining the converters of the most common
+fields (strings, numbers, dates, enums and foreign keys).
+
+The generated function returns the same data as
+`schema.dump(obj, update_fields=False).data`, when anything unusual
+happens (a converter raising, a subscriptable object...) it falls back
+to `schema.dump` for that object so errors are reported the same way.
+"""
+from marshmallow import fields
+from marshmallow.schema import BaseSchema
+from marshmallow.utils import ensure_text_type, get_value, missing
+
+from core.models.base import Model
+from core.models.enum import EnumSymbol
+from core.schema import UUID, Date, Enum
+
+
+def serialize_model(value, related):
+    """
+    Inlined `Model.serialize`, `related` caches the dump function of each
+    model class for the duration of a dump.
+    """
+    model = type(value)
+    dumper = related.get(model)
+
+    if dumper is None:
+        if model.serialize is not Model.serialize:
+            dumper = model.serialize
+
+        elif hasattr(getattr(model, "schema_class", None), "compiled"):
+            dumper = get_dumper(model.schema_class.compiled())
+
+        else:
+            dumper = get_dumper(model.get_schema())
+
+        related[model] = dumper
+
+    return dumper(value)
+
+
+def schema_dumper(schema_class, related):
+    dumper = related.get(schema_class)
+
+    if dumper is None:
+        dumper = related[schema_class] = get_dumper(schema_class.compiled())
+
+    return dumper
+
+
+def is_compilable(schema):
+    schema_class = type(schema)
+
+    if schema_class.get_attribute is not BaseSchema.get_attribute:
+        return False
+
+    if schema.__accessor__ is not None or schema.extra:
+        return False
+
+    for tag, _ in schema.__processors__:
+        if tag in ("pre_dump", "post_dump"):
+            return False
+
+    return True
+
+
+class Generator:
+    def __init__(self, schema):
+        self.schema = schema
+        self.namespace = dict(
+            Model=Model,
+            EnumSymbol=EnumSymbol,
+            ensure_text_type=ensure_text_type,
+            get_value=get_value,
+            missing=missing,
+            serialize_model=serialize_model,
+            schema_dumper=schema_dumper,
+            dict_class=schema.dict_class,
+        )
+        self.lines = []
+
+    def emit(self, line, indent=0):
+        self.lines.append("    " * (indent + 1) + line)
+
+    def bind(self, name, value):
+        self.namespace[name] = value
+        return name
+
+    def generate(self):
+        schema = self.schema
+
+        self.lines.append("def dump_one(obj, related):")
+        self.emit("ret = {}" if schema.dict_class is dict else "ret = dict_class()")
+
+        for index, (attr_name, field) in enumerate(schema.fields.items()):
+            if getattr(field, "load_only", False):
+                continue
+
+            key = (schema.prefix or "") + (field.dump_to or attr_name)
+            self.field(index, attr_name, key, field)
+
+        self.emit("return ret")
+
+        return "\n".join(self.lines) + "\n"
+
+    def field(self, index, attr_name, key, field):
+        name = self.bind(f"field_{index}", field)
+
+        self.emit(f"# {attr_name}: {type(field).__name__}")
+
+        if not field._CHECK_ATTRIBUTE:
+            self.emit(f"value = {name}._serialize(None, {attr_name!r}, obj)")
+            self.emit("if value is not missing:")
+            self.emit(f"ret[{key!r}] = value", 1)
+            return
+
+        check_key = attr_name if field.attribute is None else field.attribute
+
+        if isinstance(check_key, str) and "." not in check_key:
+            self.emit(f"value = getattr(obj, {check_key!r}, missing)")
+            self.emit("if value is not missing and callable(value):")
+            self.emit("value = value()", 1)
+
+        else:
+            self.emit(f"value = get_value({check_key!r}, obj, missing)")
+
+        if field.default is missing:
+            self.emit("if value is not missing:")
+
+        else:
+            default = f"{name}.default"
+
+            if callable(field.default):
+                default += "()"
+
+            self.emit("if value is missing:")
+            self.emit(f"ret[{key!r}] = {default}", 1)
+            self.emit("else:")
+
+        self.converter(index, attr_name, key, field)
+
+    def converter(self, index, attr_name, key, field):
+        emit = self.emit
+        target = f"ret[{key!r}]"
+        field_class = type(field)
+
+        if field_class in (fields.String, Enum):
+            if field_class is Enum:
+                emit("if isinstance(value, EnumSymbol):", 1)
+                emit(f"{target} = str(value.value)", 2)
+                emit("elif value.__class__ is str:", 1)
+
+            else:
+                emit("if value.__class__ is str:", 1)
+
+            emit(f"{target} = value", 2)
+            emit("else:", 1)
+            emit(f"{target} = None if value is None else ensure_text_type(value)", 2)
+
+        elif field_class is fields.Integer and not field.as_string:
+            emit(f"{target} = None if value is None else int(value)", 1)
+
+        elif field_class is fields.Decimal:
+            validated = self.bind(f"validated_{index}", field._validated)
+
+            if field.as_string:
+                emit(f"value = {validated}(value)", 1)
+                emit(f"{target} = None if value is None else format(value, 'f')", 1)
+
+            else:
+                emit(f"{target} = {validated}(value)", 1)
+
+        elif field_class in (fields.Date, Date):
+            emit(f"{target} = None if value is None else value.isoformat()", 1)
+
+        elif field_class is UUID and hasattr(field, "embedded"):
+            emit("if isinstance(value, Model):", 1)
+
+            if not field.embedded:
+                emit("value = value.id", 2)
+                emit(f"{target} = None if value is None else str(value)", 2)
+
+            elif field._schema_class is not None:
+                schema_class = field._schema_class
+
+                name = self.bind(f"schema_class_{index}", schema_class)
+
+                if hasattr(schema_class, "compiled"):
+                    emit(f"{target} = schema_dumper({name}, related)(value)", 2)
+
+                else:
+                    emit(f"{target} = {name}().dump(value).data", 2)
+
+            else:
+                emit(f"{target} = serialize_model(value, related)", 2)
+
+            emit("else:", 1)
+            emit(f"{target} = None if value is None else str(value)", 2)
+
+        else:
+            emit(f"value = field_{index}._serialize(value, {attr_name!r}, obj)", 1)
+            emit("if value is not missing:", 1)
+            emit(f"{target} = value", 2)
+
+
+def compile_dumper(schema):
+    """
+    Generate a `dump(obj, many=False)` function specialized for `schema`.
+    The generated source is available as `dump.source`.
+    """
+
+    def fallback(obj):
+        return schema.dump(obj, many=False, update_fields=False).data
+
+    if not is_compilable(schema):
+
+        def dump(obj, many=False):
+            if many:
+                return [fallback(item) for item in obj]
+
+            return fallback(obj)
+
+        dump.source = None
+        return dump
+
+    generator = Generator(schema)
+    source = generator.generate()
+    namespace = generator.namespace
+
+    exec(compile(source, f"<dumper {type(schema).__name__}>", "exec"), namespace)
+
+    dump_one = namespace["dump_one"]
+    plain_types = set()
+
+    def dump_object(obj, related):
+        obj_type = type(obj)
+
+        if obj_type not in plain_types:
+            # Mappings are read with `obj[key]` by marshmallow.
+            if hasattr(obj_type, "__getitem__"):
+                return fallback(obj)
+
+            plain_types.add(obj_type)
+
+        try:
+            return dump_one(obj, related)
+
+        except Exception:
+            return fallback(obj)
+
+    def dump(obj, many=False):
+        related = {}
+
+        if many:
+            return [dump_object(item, related) for item in obj]
+
+        return dump_object(obj, related)
+
+    dump.source = source
+    return dump
+
+
+def get_dumper(schema):
+    """
+    Return the generated dump function of `schema`, compiled once per
+    schema instance.
+    """
+    try:
+        return schema._dumper
+
+    except AttributeError:
+        schema._dumper = compile_dumper(schema)
+        return schema._dumper
+
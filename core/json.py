@@ -1,11 +1,27 @@
 import datetime
+import re
 import uuid
+from decimal import Decimal
 from enum import Enum
 
+from flask import json
 from flask.json import JSONEncoder as BaseJSONEncoder
 
+from core.models.enum import EnumSymbol
+from core.timing import timer
+
 
 class JSONEncoder(BaseJSONEncoder):
+    """
+    Encoder used by `jsonify`, flask-restful and `dumps`.
+
+    `backend` selects the encoding implementation, `None` keeps the
+    Flask (simplejson) one. Use `make_encoder` to get an encoder class
+    bound to a backend.
+    """
+
+    backend = None
+
     def default(self, o):
 
         if isinstance(o, uuid.UUID):
@@ -17,4 +33,103 @@ class JSONEncoder(BaseJSONEncoder):
         if isinstance(o, Enum):
             return o.value
 
+        if isinstance(o, EnumSymbol):
+            return o.value
+
         return super().default(o)
+
+    def encode(self, o):
+        backend = self.backend
+
+        with timer("encode"):
+            if backend is not None and self.indent is None:
+                return backend.dumps(o, self)
+
+            return super().encode(o)
+
+
+_non_ascii = re.compile(r"[^\x00-\x7f]")
+
+
+def _escape_non_ascii(match):
+    code = ord(match.group())
+
+    if code > 0xFFFF:
+        code -= 0x10000
+        return "\\u{:04x}\\u{:04x}".format(
+            0xD800 | (code >> 10), 0xDC00 | (code & 0x3FF)
+        )
+
+    return "\\u{:04x}".format(code)
+
+
+class OrjsonBackend:
+    """
+    Native encoder: dates, datetimes, UUIDs and enums are handled by
+    orjson itself. `Decimal` values are written as is (`83.10`, like
+    simplejson) and non ASCII characters escaped when the encoder
+    `ensure_ascii` (`JSON_AS_ASCII`), so the output matches simplejson's.
+    """
+
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+
+        self.orjson = orjson
+
+    def default(self, o):
+        if isinstance(o, Decimal):
+            return self.orjson.Fragment(str(o))
+
+        if isinstance(o, EnumSymbol):
+            return o.value
+
+        raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+    def dumps(self, o, encoder):
+        orjson = self.orjson
+        option = orjson.OPT_NON_STR_KEYS
+
+        if encoder.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+
+        def default(o):
+            try:
+                return self.default(o)
+
+            except TypeError:
+                return encoder.default(o)
+
+        data = orjson.dumps(o, default=default, option=option).decode()
+
+        if encoder.ensure_ascii and not data.isascii():
+            # Non ASCII characters only appear in strings.
+            data = _non_ascii.sub(_escape_non_ascii, data)
+
+        return data
+
+
+backends = dict(simplejson=lambda: None, orjson=OrjsonBackend)
+
+
+def make_encoder(name="simplejson"):
+    """
+    Return a `JSONEncoder` subclass using the `name` backend.
+    """
+    try:
+        backend = backends[name]()
+
+    except KeyError:
+        raise ValueError(f"Unknown JSON backend `{name}`.")
+
+    return type("JSONEncoder", (JSONEncoder,), dict(backend=backend))
+
+
+def dumps(obj, cls=JSONEncoder):
+    """
+    Encode `obj` exactly like `flask.jsonify` does, without requiring
+    an application context.
+    """
+    data = json.dumps(obj, cls=cls, sort_keys=True, separators=(",", ":"))
+    return data + "\n"
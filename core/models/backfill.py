@@ -0,0 +1,229 @@
+"""
+Chunked, throttled and resumable data backfills.
+
+A backfill updates the rows of a table one primary key range at a time,
+each range in its own short transaction, instead of a single statement
+locking every row and writing the WAL in one burst. It is declared as
+SQL, run with the `:start` and `:end` (excluded) bounds of each range:
+
+    sql_backfill("transaction_merchant", "transaction", "update ... where
+        transaction.id >= :start and transaction.id < :end")
+
+or as a function of `(connection, start, end)` returning the number of
+rows it changed:
+
+    @backfill("user_email", "user")
+    def lower_emails(connection, start, end):
+        ...
+
+`flask db backfill <name>` runs the ranges in parallel workers, at most
+`--rate` rows per second. Completed ranges are recorded in the
+`backfill_progress` table in the transaction updating them, an
+interrupted run resumes where it stopped, with the same `--chunk-size`
+(or `--restart` to run every range again).
+"""
+from concurrent.futures import ThreadPoolExecutor
+from logging import getLogger
+from threading import Lock
+from time import perf_counter, sleep
+
+from sqlalchemy import text
+
+
+logger = getLogger(__name__)
+
+PROGRESS_TABLE = "backfill_progress"
+
+CREATE_PROGRESS_TABLE = f"""
+    create table if not exists {PROGRESS_TABLE} (
+        name text not null,
+        chunk_start bigint not null,
+        chunk_end bigint not null,
+        rows integer not null,
+        done_at timestamp with time zone not null default now(),
+        primary key (name, chunk_start)
+    )
+"""
+
+backfills = dict()
+
+
+class BackfillError(Exception):
+    pass
+
+
+class Backfill:
+    def __init__(self, name, table, function, chunk_size=10000, key="id"):
+        self.name = name
+        self.table = table
+        self.function = function
+        self.chunk_size = chunk_size
+        self.key = key
+
+    def __repr__(self):
+        return f"<Backfill {self.name} on {self.table}>"
+
+    def get_chunks(self, connection, chunk_size=None):
+        """
+        `(start, end)` ranges covering the keys of the table, aligned on
+        multiples of `chunk_size` so they are the same from run to run.
+        """
+        chunk_size = chunk_size or self.chunk_size
+        bounds = connection.execute(
+            f'select min("{self.key}"), max("{self.key}") from "{self.table}"'
+        ).first()
+
+        if bounds[0] is None:
+            return []
+
+        first = bounds[0] // chunk_size * chunk_size
+
+        return [
+            (start, start + chunk_size)
+            for start in range(first, bounds[1] + 1, chunk_size)
+        ]
+
+
+def backfill(name, table, chunk_size=10000, key="id"):
+    """
+    Register the decorated `function(connection, start, end)`.
+    """
+
+    def decorator(function):
+        backfills[name] = Backfill(name, table, function, chunk_size, key)
+        return function
+
+    return decorator
+
+
+def sql_backfill(name, table, sql, chunk_size=10000, key="id"):
+    """
+    Register `sql`, run with the `:start` and `:end` bounds of each range.
+    """
+    statement = text(sql)
+
+    def run(connection, start, end):
+        return connection.execute(statement, start=start, end=end).rowcount
+
+    backfills[name] = Backfill(name, table, run, chunk_size, key)
+
+
+class Throttle:
+    """
+    Delay callers so that at most `rate` rows per second are processed.
+    """
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.rows = 0
+        self.start = perf_counter()
+        self.lock = Lock()
+
+    def wait(self, rows):
+        if not self.rate:
+            return
+
+        with self.lock:
+            self.rows += rows
+            delay = self.start + self.rows / self.rate - perf_counter()
+
+        if delay > 0:
+            sleep(delay)
+
+
+def get_done_chunks(connection, name):
+    connection.execute(CREATE_PROGRESS_TABLE)
+
+    query = text(
+        f"select chunk_start, chunk_end from {PROGRESS_TABLE} where name = :name"
+    )
+    return {(start, end) for start, end in connection.execute(query, name=name)}
+
+
+def reset_backfill(engine, name):
+    with engine.begin() as connection:
+        connection.execute(CREATE_PROGRESS_TABLE)
+        connection.execute(
+            text(f"delete from {PROGRESS_TABLE} where name = :name"), name=name
+        )
+
+
+def run_chunk(engine, backfill_, start, end, throttle):
+    with engine.begin() as connection:
+        rows = backfill_.function(connection, start, end) or 0
+
+        connection.execute(
+            text(
+                f"""
+                insert into {PROGRESS_TABLE} (name, chunk_start, chunk_end, rows)
+                values (:name, :start, :end, :rows)
+                """
+            ),
+            name=backfill_.name,
+            start=start,
+            end=end,
+            rows=rows,
+        )
+
+    logger.info(f"Backfill {backfill_.name}: [{start}, {end}) {rows} rows")
+    throttle.wait(rows)
+
+    return rows
+
+
+def run_backfill(engine, name, workers=4, rate=None, chunk_size=None):
+    """
+    Run the remaining ranges of backfill `name`, returns the number of
+    ranges run and skipped and the number of rows changed. When a range
+    fails, the ranges not started yet are cancelled and the error raised.
+    Raises `BackfillError` when resuming a run made with another chunk size.
+    """
+    backfill_ = backfills[name]
+    chunk_size = chunk_size or backfill_.chunk_size
+
+    with engine.begin() as connection:
+        chunks = backfill_.get_chunks(connection, chunk_size)
+        done = get_done_chunks(connection, name)
+
+    # Ranges of another size don't line up, some keys would be skipped.
+    sizes = sorted({end - start for start, end in done} - {chunk_size})
+
+    if sizes:
+        raise BackfillError(
+            f"Backfill {name} was run with ranges of "
+            f"{', '.join(map(str, sizes))} keys, resume it with the same chunk "
+            "size or restart it."
+        )
+
+    remaining = [chunk for chunk in chunks if chunk not in done]
+    throttle = Throttle(rate)
+    start = perf_counter()
+
+    with ThreadPoolExecutor(workers) as executor:
+        rows = sum(
+            executor.map(
+                lambda chunk: run_chunk(engine, backfill_, *chunk, throttle),
+                remaining,
+            )
+        )
+
+    return dict(
+        chunks=len(remaining),
+        skipped=len(chunks) - len(remaining),
+        rows=rows,
+        duration=perf_counter() - start,
+    )
+
+
+sql_backfill(
+    "transaction_merchant",
+    "transaction",
+    """
+    update transaction
+        set merchant_id = merchant.id
+        from merchant
+            where transaction.descriptor = merchant.name
+            and transaction.merchant_id is distinct from merchant.id
+            and transaction.id >= :start and transaction.id < :end
+    """,
+)
@@ -2,13 +2,16 @@ import uuid
 from datetime import datetime
 
 from flask import abort, g
-from flask_sqlalchemy import BaseQuery, SQLAlchemy
+from flask_sqlalchemy import BaseQuery, SQLAlchemy as BaseSQLAlchemy
 from sqlalchemy import inspect
 from sqlalchemy.ext.declarative import declared_attr
-from sqlalchemy.orm import contains_eager
+from sqlalchemy import orm
+from sqlalchemy.orm import ColumnProperty, RelationshipProperty, contains_eager
 from sqlalchemy.orm.exc import NoResultFound
 from sqlalchemy_utils import UUIDType
 
+from .pool import pool_options
+
 
 class Query(BaseQuery):
     def one_or_404(self):
@@ -43,13 +46,138 @@ class Query(BaseQuery):
 
         return query
 
+    def load_fields(self, schema):
+        """
+        Only select the columns dumped by `schema` (`load_only`), along with
+        the foreign keys of its to-one relationships. Every column is
+        loaded when the schema reads attributes that aren't mapped.
+        """
+        mapper = inspect(self._entity_zero().class_)
+        keys = {
+            mapper.get_property_by_column(column).key for column in mapper.primary_key
+        }
+
+        for name, field in schema.fields.items():
+            if field.load_only:
+                continue
+
+            key = getattr(field, "path", None) or field.attribute or name
+            prop = mapper.attrs.get(key.split(".")[0])
+
+            if isinstance(prop, ColumnProperty):
+                keys.add(prop.key)
+
+            elif isinstance(prop, RelationshipProperty):
+                keys.update(
+                    mapper.get_property_by_column(column).key
+                    for column in prop.local_columns
+                    if not prop.uselist
+                )
+
+            else:
+                return self
+
+        if keys.issuperset(mapper.column_attrs.keys()):
+            return self
+
+        return self.options(orm.load_only(*keys))
+
+    def eager_load(self, schema):
+        """
+        Load every relationship dumped by `schema` along with the query
+        results: to-one relationships are joined (`joinload`), collections
+        and relationships below them are fetched with one `selectinload`
+        query per path.
+        """
+        query = self
+        mappers = {inspect(self._entity_zero().class_)}
+        joined = {()}
 
-db = SQLAlchemy(session_options={"expire_on_commit": False})
+        for path in schema.eager_load_paths():
+            prop = path[-1]
+            attrs = [prop.class_attribute for prop in path]
+
+            if path[:-1] in joined and not prop.uselist and prop.mapper not in mappers:
+                mappers.add(prop.mapper)
+                joined.add(path)
+
+                query = query.joinload(attrs[-1], path=attrs)
+                continue
+
+            option = orm
+
+            for index, attr in enumerate(attrs):
+                if path[: index + 1] in joined:
+                    option = option.contains_eager(attr)
+
+                else:
+                    option = option.selectinload(attr)
+
+            query = query.options(option)
+
+        return query
+
+    def page(self, page, per_page):
+        """
+        Items of `page`, unlike `paginate` the rows are never counted.
+        Aborts with a 404 for pages out of range, like
+        `paginate(error_out=True)`.
+        """
+        if page < 1:
+            abort(404)
+
+        items = self.limit(per_page).offset((page - 1) * per_page).all()
+
+        if not items and page != 1:
+            abort(404)
+
+        return items
+
+    def estimate_count(self):
+        """
+        Number of rows estimated by the planner, the query isn't run.
+        """
+        statement = self.order_by(None).limit(None).offset(None).statement
+        connection = self.session.connection()
+        compiled = statement.compile(dialect=connection.dialect)
+
+        plan = connection.execute(
+            f"explain (format json) {compiled}", compiled.params
+        ).scalar()
+
+        return plan[0]["Plan"]["Plan Rows"]
+
+
+class SQLAlchemy(BaseSQLAlchemy):
+    def apply_pool_defaults(self, app, options):
+        options.update(pool_options(app.config))
+
+
+db = SQLAlchemy(query_class=Query, session_options={"expire_on_commit": False})
 
 
 session = db.session
 
 
+def dispose_engine(app):
+    """
+    Forget connections inherited from the parent process.
+    Must run in each forked worker before it touches the database,
+    sockets opened by the uwsgi master can't be shared between workers.
+    """
+    session.remove()
+
+    engine = db.get_engine(app)
+
+    try:
+        # Leave the parent connections open, they still belong to it.
+        engine.dispose(close=False)
+
+    except TypeError:
+        # SQLAlchemy < 1.4.33
+        engine.dispose()
+
+
 class GUID(UUIDType):
     pass
 
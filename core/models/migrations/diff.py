@@ -0,0 +1,119 @@
+"""
+Structural comparison of database schemas.
+
+`describe` reflects a schema through the SQLAlchemy inspector into a
+sorted list of facts, one per enum, column, key, constraint and index:
+
+    table transaction column amount NUMERIC(10, 2) not null
+    table transaction foreign key transaction_user_id_fkey (user_id) -> user (id)
+    table transaction index user_index (id, user_id)
+
+Two schemas match when their facts do, `difflib` then shows what differs.
+Facts don't depend on the schema name, so the same database can hold the
+schemas to compare side by side (see `check_revision`).
+"""
+from sqlalchemy import inspect
+
+
+IGNORED_TABLES = ("alembic_version",)
+
+
+def format_columns(columns):
+    return f"({', '.join(columns)})"
+
+
+def format_default(default, schema):
+    if default is None:
+        return None
+
+    # Sequences are qualified with the schema name: `nextval('a.id_seq'::regclass)`
+    return default.replace(f'"{schema}".', "").replace(f"{schema}.", "")
+
+
+def describe_table(inspector, dialect, table, schema):
+    prefix = f"table {table}"
+    facts = [prefix]
+
+    for column in inspector.get_columns(table, schema):
+        type_ = column["type"].compile(dialect=dialect)
+        fact = f"{prefix} column {column['name']} {type_}"
+
+        if not column["nullable"]:
+            fact += " not null"
+
+        default = format_default(column.get("default"), schema)
+
+        if default is not None:
+            fact += f" default {default}"
+
+        facts.append(fact)
+
+    primary_key = inspector.get_pk_constraint(table, schema)
+
+    if primary_key["constrained_columns"]:
+        facts.append(
+            f"{prefix} primary key {primary_key['name']} "
+            f"{format_columns(primary_key['constrained_columns'])}"
+        )
+
+    for foreign_key in inspector.get_foreign_keys(table, schema):
+        fact = (
+            f"{prefix} foreign key {foreign_key['name']} "
+            f"{format_columns(foreign_key['constrained_columns'])} -> "
+            f"{foreign_key['referred_table']} "
+            f"{format_columns(foreign_key['referred_columns'])}"
+        )
+        options = {
+            key: value
+            for key, value in foreign_key.get("options", {}).items()
+            if value is not None
+        }
+
+        if options:
+            fact += " " + " ".join(
+                f"{key} {value}" for key, value in sorted(options.items())
+            )
+
+        facts.append(fact)
+
+    for unique in inspector.get_unique_constraints(table, schema):
+        facts.append(
+            f"{prefix} unique {unique['name']} {format_columns(unique['column_names'])}"
+        )
+
+    for check in inspector.get_check_constraints(table, schema):
+        facts.append(f"{prefix} check {check['name']} {check['sqltext']}")
+
+    for index in inspector.get_indexes(table, schema):
+        # Unique constraints are also reported as indexes.
+        if index.get("duplicates_constraint"):
+            continue
+
+        unique = "unique " if index["unique"] else ""
+        facts.append(
+            f"{prefix} {unique}index {index['name']} "
+            f"{format_columns(index['column_names'])}"
+        )
+
+    return facts
+
+
+def describe(connection, schema, table=None):
+    """
+    Sorted facts of the tables (only `table` when given) and enums of
+    `schema`.
+    """
+    inspector = inspect(connection)
+    facts = []
+
+    if table is None:
+        for enum in inspector.get_enums(schema):
+            facts.append(f"enum {enum['name']} ({', '.join(enum['labels'])})")
+
+    for name in inspector.get_table_names(schema):
+        if name in IGNORED_TABLES or (table is not None and name != table):
+            continue
+
+        facts += describe_table(inspector, connection.dialect, name, schema)
+
+    return sorted(facts)
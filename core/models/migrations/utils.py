@@ -1,20 +1,23 @@
 
-from subprocess import Popen, PIPE
 import os
-import re
 
-from copy import copy
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from difflib import unified_diff
 from logging import getLogger
+from threading import Event, Thread
+from time import perf_counter
 
 from flask import current_app
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import ProgrammingError
 
 from alembic.script import ScriptDirectory
 from alembic.environment import MigrationContext
 from alembic.operations import Operations
 
 from ..base import db, Model
+from .diff import describe
 
 
 logger = getLogger(__name__)
@@ -22,89 +25,11 @@ logger = getLogger(__name__)
 
 alembic_version_table = "alembic_version"
 
-
-script = ScriptDirectory(os.path.dirname(__file__))
-
-
-def order_columns(sql):
-    r = re.compile(r'CREATE TABLE ?["a-z_\.]*? \s*\([^;]+\);', re.MULTILINE)
-
-    for match in r.findall(sql):
-        match_lines = match.splitlines()
-
-        sorted_lines = copy(match_lines)
-        sorted_lines = sorted_lines[1:-1]
-        sorted_lines[-1] = "%s," % sorted_lines[-1]
-        sorted_lines.sort()
-        sorted_lines.insert(0, match_lines[0])
-        sorted_lines.append(match_lines[-1])
-
-        sql = sql.replace("\n".join(match_lines), "\n".join(sorted_lines))
-
-    return sql
-
-
-def validate_line(line):
-    excludes = ("-", "COPY", "\\", "SELECT")
-
-    if len(line) == 1:
-        return False
-
-    for exclude in excludes:
-        if line.startswith(exclude):
-            return False
-
-    return True
+MIGRATIONS_SCHEMA = "check_migrations"
+METADATA_SCHEMA = "check_metadata"
 
 
-def dump_sql_create(engine, table=None):
-    url = engine.url
-
-    port = url.port
-
-    if port is None:
-        port = 5432
-
-    command = [
-        "/usr/bin/pg_dump",
-        url.database,
-        "-h",
-        url.host,
-        "-p",
-        str(port),
-        "-x",
-        "-O",
-        "--exclude-schema=views",
-        "-T",
-        alembic_version_table,
-    ]
-
-    if table is not None:
-        command += ["-t", table]
-
-    env = {}
-    if url.username:
-        env["PGUSER"] = url.username.encode("utf-8")
-    if url.password:
-        env["PGPASSWORD"] = url.password.encode("utf-8")
-
-    p = Popen(command, stdout=PIPE, env=env)
-    stdout, _ = p.communicate()
-    assert p.returncode == 0
-
-    sql = order_columns(stdout.decode())
-
-    lines = []
-    triggers = []
-    for line in sql.splitlines(1):
-        if validate_line(line):
-            if line.startswith("CREATE TRIGGER"):
-                triggers.append(line)
-                continue
-
-            lines.append(line)
-    lines.extend(sorted(triggers))
-    return lines
+script = ScriptDirectory(os.path.dirname(__file__))
 
 
 def get_context(connection, revision="head", downgrade=False):
@@ -146,11 +71,11 @@ class DiffError(Exception):
         super().__init__(*args, **kwargs)
 
 
-def check_diff(from_sql, to_sql, from_file, to_file):
+def check_diff(from_facts, to_facts, from_name, to_name):
     lines = [
         line
         for line in unified_diff(
-            from_sql, to_sql, fromfile=from_file, tofile=to_file,
+            from_facts, to_facts, fromfile=from_name, tofile=to_name, lineterm=""
         )
     ]
 
@@ -160,45 +85,75 @@ def check_diff(from_sql, to_sql, from_file, to_file):
     return True
 
 
+def in_scratch_schema(engine, schema, build):
+    """
+    Run `build(connection)` with `schema` as the only schema of the search
+    path, the schema is dropped afterwards.
+    """
+    with engine.connect() as connection:
+        connection.execute(f'drop schema if exists "{schema}" cascade')
+        connection.execute(f'create schema "{schema}"')
+
+        try:
+            with connection.begin():
+                connection.execute(f'set search_path to "{schema}"')
+                return build(connection)
+
+        finally:
+            connection.execute("reset search_path")
+            connection.execute(f'drop schema if exists "{schema}" cascade')
+
+
 def check_revision(revision, table=None, step=None):
     """Checks if upgrading to given revision produces expected
     schema by comparing to metadata.
     :param string revision: The revision to check.
     :param string table: Tables to check.
     :param string step: An optional revision to check downgrade.
+
+    The migrated and metadata schemas are built concurrently in two
+    scratch schemas of the test database, then reflected and compared
+    (see `core.models.migrations.diff`).
     """
-    metadata = Model.metadata
     engine = create_engine(current_app.config["SQLALCHEMY_TEST_DATABASE_URI"])
 
-    # Builds from migrations
-    drop(engine)
+    def from_migrations(connection):
+        facts = {}
 
-    connection = engine.connect()
+        if step:
+            migrate(connection, step)
+            facts["upgrade"] = describe(connection, MIGRATIONS_SCHEMA, table)
 
-    step_sql = None
+        migrate(connection, revision)
+        facts["migrations"] = describe(connection, MIGRATIONS_SCHEMA, table)
 
-    if step:
-        migrate(connection, step)
-        step_sql = dump_sql_create(engine, table)
+        if step:
+            migrate(connection, step, downgrade=True)
+            facts["downgrade"] = describe(connection, MIGRATIONS_SCHEMA, table)
+
+        return facts
 
-    migrate(connection, revision)
-    migrated_sql = dump_sql_create(engine, table)
+    def from_metadata(connection):
+        Model.metadata.create_all(connection)
+        return dict(metadata=describe(connection, METADATA_SCHEMA, table))
 
-    # Builds from meta
-    drop(engine)
-    metadata.create_all(engine)
-    from_meta_sql = dump_sql_create(engine, table)
+    try:
+        with ThreadPoolExecutor(2) as executor:
+            migrated = executor.submit(
+                in_scratch_schema, engine, MIGRATIONS_SCHEMA, from_migrations
+            )
+            from_meta = executor.submit(
+                in_scratch_schema, engine, METADATA_SCHEMA, from_metadata
+            )
+            facts = dict(migrated.result(), **from_meta.result())
 
-    drop(engine)
+    finally:
+        engine.dispose()
 
-    check_diff(from_meta_sql, migrated_sql, "metadata", "migrations")
+    check_diff(facts["metadata"], facts["migrations"], "metadata", "migrations")
 
     if step:
-        migrate(connection, revision)
-        migrate(connection, step, downgrade=True)
-        downgrade_sql = dump_sql_create(engine, table)
-        check_diff(step_sql, downgrade_sql, "upgrade", "downgrade")
-        drop(engine)
+        check_diff(facts["upgrade"], facts["downgrade"], "upgrade", "downgrade")
 
     return True
 
@@ -222,6 +177,190 @@ def alter_enum(op, name, modifier):
         cursor.close()
 
 
+def quote(name):
+    return f'"{name}"'
+
+
+@contextmanager
+def outside_transaction(op):
+    """
+    Commit the migration transaction and yield a cursor of another
+    connection in autocommit mode, with the same search path. The
+    migration transaction starts again afterwards.
+    """
+    bind = op.get_bind()
+    search_path = bind.execute("show search_path").scalar()
+    connection = bind.engine.raw_connection()
+
+    op.execute("commit;")
+
+    try:
+        # The checkout may have opened a transaction (pool pre ping...)
+        connection.rollback()
+        connection.connection.autocommit = True
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"set search_path to {search_path}")
+            yield cursor
+
+    finally:
+        connection.connection.autocommit = False
+        connection.close()
+
+    op.execute("begin;")
+
+
+INDEX_PROGRESS = text(
+    """
+    select phase, blocks_done, blocks_total, tuples_done, tuples_total,
+        lockers_done, lockers_total
+    from pg_stat_progress_create_index
+    where pid = :pid
+    """
+)
+
+
+def format_progress(progress):
+    for kind in ("blocks", "tuples", "lockers"):
+        total = progress[f"{kind}_total"]
+
+        if total:
+            done = progress[f"{kind}_done"]
+            return f"{progress['phase']}, {done}/{total} {kind} ({done / total:.0%})"
+
+    return progress["phase"]
+
+
+def report_index_progress(engine, name, pid, stop, interval):
+    """
+    Log the `pg_stat_progress_create_index` row of backend `pid` every
+    `interval` seconds until `stop` is set.
+    """
+    with engine.connect() as connection:
+        connection = connection.execution_options(isolation_level="AUTOCOMMIT")
+
+        while not stop.wait(interval):
+            try:
+                progress = connection.execute(INDEX_PROGRESS, pid=pid).first()
+
+            except ProgrammingError:
+                # PostgreSQL < 12
+                return
+
+            if progress is not None:
+                logger.info(f"Index {name}: {format_progress(progress)}")
+
+
+def execute_with_progress(op, cursor, name, sql, interval=10):
+    cursor.execute("select pg_backend_pid()")
+    pid = cursor.fetchone()[0]
+
+    stop = Event()
+    reporter = Thread(
+        target=report_index_progress,
+        args=(op.get_bind().engine, name, pid, stop, interval),
+        daemon=True,
+    )
+    start = perf_counter()
+    reporter.start()
+
+    try:
+        cursor.execute(sql)
+
+    finally:
+        stop.set()
+        reporter.join()
+
+    logger.info(f"Index {name}: done in {perf_counter() - start:.1f}s")
+
+
+def index_state(cursor, name):
+    """
+    `None` when index `name` doesn't exist, else whether it is valid
+    (an interrupted concurrent build leaves an invalid index behind).
+    """
+    cursor.execute(
+        """
+        select indisvalid from pg_index
+        where indexrelid = to_regclass(%(name)s)
+        """,
+        dict(name=quote(name)),
+    )
+    row = cursor.fetchone()
+
+    return row[0] if row is not None else None
+
+
+def create_index_concurrently(
+    op, name, table, columns, unique=False, where=None, progress_interval=10
+):
+    """
+    `CREATE INDEX CONCURRENTLY`, doesn't block writes to `table`. The
+    invalid index of a previously interrupted build is dropped first.
+    """
+    with outside_transaction(op) as cursor:
+        valid = index_state(cursor, name)
+
+        if valid:
+            return logger.info(f"Index {name} already exists")
+
+        if valid is False:
+            cursor.execute(f"drop index concurrently {quote(name)}")
+
+        sql = (
+            f"create {'unique ' if unique else ''}index concurrently {quote(name)} "
+            f"on {quote(table)} ({', '.join(quote(column) for column in columns)})"
+        )
+
+        if where is not None:
+            sql += f" where {where}"
+
+        execute_with_progress(op, cursor, name, sql, progress_interval)
+
+
+def drop_index_concurrently(op, name):
+    with outside_transaction(op) as cursor:
+        cursor.execute(f"drop index concurrently if exists {quote(name)}")
+
+
+def swap_index_concurrently(op, name, table, columns, **kwargs):
+    """
+    Replace index `name` by an index on `columns` without blocking
+    writes: the new index is built, the old one dropped, then the new one
+    renamed.
+    """
+    new_name = f"{name}_new"
+
+    create_index_concurrently(op, new_name, table, columns, **kwargs)
+    drop_index_concurrently(op, name)
+    op.execute(f"alter index {quote(new_name)} rename to {quote(name)}")
+
+
+def add_constraint_not_valid(op, table, name, definition, validate=True):
+    """
+    Add constraint `name` (e.g. `check (amount >= 0)`) without scanning
+    `table` under an exclusive lock: the constraint is added `NOT VALID`
+    (only checked for new rows), then validated outside of the migration
+    transaction, which doesn't block writes.
+    """
+    op.execute(
+        f"alter table {quote(table)} add constraint {quote(name)} {definition} "
+        "not valid"
+    )
+
+    if validate:
+        validate_constraint(op, table, name)
+
+
+def validate_constraint(op, table, name):
+    with outside_transaction(op) as cursor:
+        start = perf_counter()
+        cursor.execute(
+            f"alter table {quote(table)} validate constraint {quote(name)}"
+        )
+        logger.info(f"Constraint {name}: validated in {perf_counter() - start:.1f}s")
+
+
 def drop(engine=None):
     if engine is None:
         engine = db.engine
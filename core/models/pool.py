@@ -0,0 +1,120 @@
+import os
+from logging import getLogger
+from time import perf_counter
+
+from sqlalchemy.pool import NullPool, QueuePool
+
+
+logger = getLogger(__name__)
+
+
+class CheckoutTimerMixin:
+    """
+    Record how long callers wait to get a connection out of the pool.
+    Counters live on the pool instance, so they are reset whenever
+    the engine is disposed (i.e. after each uwsgi fork).
+    """
+
+    slow_checkout = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.checkout_wait = 0.0
+        self.checkout_wait_max = 0.0
+
+    def _do_get(self):
+        start = perf_counter()
+
+        try:
+            return super()._do_get()
+
+        finally:
+            elapsed = perf_counter() - start
+
+            self.checkouts += 1
+            self.checkout_wait += elapsed
+
+            if elapsed > self.checkout_wait_max:
+                self.checkout_wait_max = elapsed
+
+            if self.slow_checkout is not None and elapsed > self.slow_checkout:
+                logger.warning(
+                    f"Waited {elapsed * 1000:.1f}ms for a database connection "
+                    f"({self.status()})"
+                )
+
+
+class TimedQueuePool(CheckoutTimerMixin, QueuePool):
+    pass
+
+
+class TimedNullPool(CheckoutTimerMixin, NullPool):
+    pass
+
+
+def pool_options(config):
+    """
+    Build `create_engine` pool options from the application config.
+
+    With `SQLALCHEMY_PGBOUNCER` enabled connections are not kept by the
+    workers: pgbouncer (transaction pooling) owns them, so every checkout
+    opens a fresh client connection to the bouncer.
+    """
+    slow_checkout = config.get("SQLALCHEMY_POOL_SLOW_CHECKOUT")
+
+    if config.get("SQLALCHEMY_PGBOUNCER"):
+        poolclass = TimedNullPool
+        options = dict(poolclass=poolclass)
+
+    else:
+        poolclass = TimedQueuePool
+        options = dict(poolclass=poolclass)
+
+        for key in ("pool_size", "max_overflow", "pool_timeout", "pool_recycle"):
+            value = config.get(f"SQLALCHEMY_{key.upper()}")
+
+            if value is not None:
+                options[key] = value
+
+    options["pool_pre_ping"] = config.get("SQLALCHEMY_POOL_PRE_PING", False)
+
+    if slow_checkout is not None:
+        # Subclass so the threshold survives `Pool.recreate`.
+        options["poolclass"] = type(
+            poolclass.__name__, (poolclass,), dict(slow_checkout=slow_checkout / 1000)
+        )
+
+    return options
+
+
+def pool_stats(engine):
+    """
+    Expose the current worker pool usage.
+    """
+    pool = engine.pool
+
+    stats = dict(pid=os.getpid(), pool=pool.__class__.__name__)
+
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+            max_overflow=pool._max_overflow,
+        )
+
+    if isinstance(pool, CheckoutTimerMixin):
+        checkouts = pool.checkouts
+
+        stats.update(
+            checkouts=checkouts,
+            checkout_wait_ms=round(pool.checkout_wait * 1000, 3),
+            checkout_wait_avg_ms=round(
+                pool.checkout_wait * 1000 / checkouts if checkouts else 0, 3
+            ),
+            checkout_wait_max_ms=round(pool.checkout_wait_max * 1000, 3),
+        )
+
+    return stats
@@ -0,0 +1,72 @@
+"""
+Totals of the paginated listings.
+
+Listings don't count their rows by default. The `total` query parameter
+asks for the number of rows of the whole listing, returned in the
+`X-Total-Count` header along with `X-Total-Mode`:
+
+    none        no total (default)
+    exact       `COUNT(*)`
+    estimated   count of the analytics snapshot (see `core.analytics`)
+                when it knows the entity, else the planner row estimate
+"""
+from flask import abort, current_app, has_request_context, request
+
+
+TOTAL_MODES = ("none", "exact", "estimated")
+
+
+def get_total_mode(value=None):
+    """
+    Total mode requested with the `total` query parameter, aborts with a
+    400 on unknown modes.
+    """
+    if value is None and has_request_context():
+        value = request.args.get("total")
+
+    mode = value or "none"
+
+    if mode not in TOTAL_MODES:
+        abort(400, f"Unknown total mode {mode}, use {', '.join(TOTAL_MODES)}.")
+
+    return mode
+
+
+def rollup_count(entity, entity_id):
+    """
+    Transactions of `entity` in the analytics snapshot, `None` when there
+    is no snapshot or the entity isn't in it (yet).
+    """
+    # NumPy is only imported by the workers using the snapshot.
+    from core.analytics import get_analytics
+
+    try:
+        analytics = get_analytics(current_app.config["ANALYTICS_PATH"])
+        count = analytics.stats(entity, int(entity_id))["count"]
+
+    except (LookupError, ValueError):
+        return None
+
+    return count or None
+
+
+def get_total(query, mode, entity=None, entity_id=None):
+    """
+    Total of the listing of `query` (without pagination) in `mode`.
+    """
+    if mode == "exact":
+        return query.order_by(None).count()
+
+    if mode == "estimated":
+        count = rollup_count(entity, entity_id) if entity is not None else None
+        return count if count is not None else query.estimate_count()
+
+    return None
+
+
+def add_total(response, mode, total):
+    if total is not None:
+        response.headers["X-Total-Count"] = str(total)
+        response.headers["X-Total-Mode"] = mode
+
+    return response
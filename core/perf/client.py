@@ -0,0 +1,89 @@
+import asyncio
+from time import perf_counter
+from urllib.parse import urlsplit
+
+
+class Result:
+    def __init__(self, status, duration, size, body=None):
+        self.status = status
+        self.duration = duration
+        self.size = size
+        self.body = body
+
+
+async def get(host, port, path, headers=None, keep_body=False):
+    """
+    Minimal HTTP/1.1 GET, one connection per request.
+    Returns a `Result` with the status code, the duration in seconds
+    and the body size (and the body itself with `keep_body`).
+    """
+    start = perf_counter()
+    reader, writer = await asyncio.open_connection(host, port)
+
+    try:
+        lines = [f"GET {path} HTTP/1.1", f"Host: {host}:{port}", "Connection: close"]
+        lines += [f"{key}: {value}" for key, value in (headers or {}).items()]
+
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode())
+        await writer.drain()
+
+        response = await reader.read()
+
+    finally:
+        writer.close()
+
+    head, _, body = response.partition(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1]) if head else 0
+
+    return Result(
+        status, perf_counter() - start, len(body), body if keep_body else None
+    )
+
+
+async def run(url, paths, concurrency, requests, headers=None):
+    """
+    Send `requests` GET requests spread over `paths` with at most
+    `concurrency` requests in flight.
+    """
+    url = urlsplit(url)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(path):
+        async with semaphore:
+            try:
+                return await get(url.hostname, url.port or 80, path, headers)
+
+            except OSError:
+                return Result(0, 0, 0)
+
+    start = perf_counter()
+    results = await asyncio.gather(
+        *(one(paths[i % len(paths)]) for i in range(requests))
+    )
+
+    return results, perf_counter() - start
+
+
+def percentile(values, rank):
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not values:
+        return None
+
+    index = max(0, min(len(values) - 1, int(round(rank / 100 * len(values))) - 1))
+    return values[index]
+
+
+def summarize(results, elapsed):
+    durations = sorted(result.duration * 1000 for result in results)
+
+    return dict(
+        requests=len(results),
+        errors=sum(1 for result in results if not 200 <= result.status < 300),
+        throughput=round(len(results) / elapsed, 1) if elapsed else None,
+        p50=percentile(durations, 50),
+        p95=percentile(durations, 95),
+        p99=percentile(durations, 99),
+        max=durations[-1] if durations else None,
+    )
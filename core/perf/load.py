@@ -0,0 +1,269 @@
+"""
+Load test of the uwsgi deployment (`flask perf load`).
+
+The application is started with `core/api/uwsgi.ini` on a local port
+and driven by the asyncio client of `core.perf.client`, either with a
+fixed number of requests in flight (`concurrency`) or at a fixed arrival
+rate (`rate`, requests per second, open loop: slow responses don't slow
+the senders down).
+
+While the load runs the health check is polled to sample the pool of the
+workers, saturation is the highest share of `pool_size + max_overflow`
+connections checked out seen for a worker.
+"""
+import asyncio
+import json
+import os
+import random
+import re
+import subprocess
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+from .client import Result, get, summarize
+
+
+UWSGI_INI = os.path.join(os.path.dirname(__file__), "..", "api", "uwsgi.ini")
+
+DEFAULT_MIX = (
+    "/users/1=4",
+    "/merchants/40=4",
+    "/users/1/20=1",
+    "/users/1/average=2",
+    "/users/1/average/2019/6=2",
+    "/merchants/40/average=2",
+)
+
+
+def split_weight(item):
+    """
+    `path=weight` to `(path, weight)`, the weight defaults to 1. The text
+    after the last `=` is only a weight when it is a number and not the
+    value of the last query parameter: `/users/1?page=2` weighs 1,
+    `/users/1?page=2=3` weighs 3.
+    """
+    path, _, weight = item.rpartition("=")
+    last_parameter = path.partition("?")[2].rpartition("&")[2]
+
+    if not path or ("?" in path and "=" not in last_parameter):
+        return item, 1.0
+
+    try:
+        return path, float(weight)
+
+    except ValueError:
+        return item, 1.0
+
+
+def parse_mix(mix):
+    """
+    `path=weight` items to `(paths, weights)`, see `split_weight`.
+    """
+    paths, weights = [], []
+
+    for item in mix:
+        path, weight = split_weight(item)
+
+        paths.append(path)
+        weights.append(weight)
+
+    return paths, weights
+
+
+class Server:
+    """
+    uwsgi running the application, output is kept to count harakiris.
+    """
+
+    def __init__(self, port, processes=None, ini=UWSGI_INI, harakiri=None, env=None):
+        self.port = port
+        self.url = f"http://localhost:{port}"
+        self.log = tempfile.NamedTemporaryFile("w+", suffix=".log")
+
+        command = ["uwsgi", "--ini", ini]
+
+        if processes is not None:
+            command += ["--processes", str(processes)]
+
+        # Requests are sent with a `localhost:<port>` Host header.
+        env = dict(
+            os.environ, PORT=str(port), SERVER_NAME=f"localhost:{port}", **(env or {})
+        )
+
+        if harakiri is not None:
+            env["UWSGI_HARAKIRI"] = str(harakiri)
+
+        self.process = subprocess.Popen(
+            command, env=env, stdout=self.log, stderr=subprocess.STDOUT
+        )
+
+    def wait(self, timeout=30):
+        deadline = time.monotonic() + timeout
+        loop = asyncio.get_event_loop()
+
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"uwsgi exited:\n{self.output()}")
+
+            try:
+                result = loop.run_until_complete(
+                    get("localhost", self.port, "/health-check")
+                )
+
+                if result.status == 200:
+                    return
+
+            except OSError:
+                pass
+
+            time.sleep(0.2)
+
+        raise RuntimeError(f"uwsgi did not start in {timeout}s:\n{self.output()}")
+
+    def output(self):
+        self.log.seek(0)
+        return self.log.read()
+
+    def harakiris(self):
+        return len(re.findall(r"HARAKIRI ON WORKER", self.output()))
+
+    def stop(self):
+        self.process.terminate()
+
+        try:
+            self.process.wait(10)
+
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+        self.log.close()
+
+
+async def sample_pools(host, port, samples, interval=0.5):
+    """
+    Poll the health check, keeping the busiest pool state seen per worker.
+    """
+    while True:
+        try:
+            result = await get(host, port, "/health-check", keep_body=True)
+            pool = json.loads(result.body)["pool"]
+            previous = samples.get(pool["pid"])
+
+            if previous is None or pool.get("checked_out", 0) >= previous.get(
+                "checked_out", 0
+            ):
+                samples[pool["pid"]] = pool
+
+        except (OSError, ValueError, KeyError):
+            pass
+
+        await asyncio.sleep(interval)
+
+
+async def load(url, mix, requests, concurrency=None, rate=None, headers=None):
+    """
+    Send `requests` requests drawn from the weighted `mix`.
+    """
+    url = urlsplit(url)
+    host, port = url.hostname, url.port or 80
+    paths, weights = parse_mix(mix)
+    chosen = random.choices(paths, weights, k=requests)
+
+    samples = {}
+    sampler = asyncio.ensure_future(sample_pools(host, port, samples))
+    semaphore = asyncio.Semaphore(concurrency or requests)
+
+    async def one(path, delay=0):
+        if delay:
+            await asyncio.sleep(delay)
+
+        async with semaphore:
+            try:
+                return await get(host, port, path, headers)
+
+            except OSError:
+                return Result(0, 0, 0)
+
+    start = time.perf_counter()
+
+    try:
+        results = await asyncio.gather(
+            *(
+                one(path, index / rate if rate else 0)
+                for index, path in enumerate(chosen)
+            )
+        )
+
+    finally:
+        sampler.cancel()
+
+    return results, time.perf_counter() - start, samples
+
+
+def saturation(samples):
+    ratios = [
+        sample["checked_out"] / (sample["size"] + sample["max_overflow"])
+        for sample in samples.values()
+        if sample.get("size")
+    ]
+
+    return round(max(ratios), 3) if ratios else None
+
+
+def pool_wait_avg(samples):
+    checkouts = sum(sample.get("checkouts", 0) for sample in samples.values())
+
+    if not checkouts:
+        return None
+
+    wait = sum(sample.get("checkout_wait_ms", 0) for sample in samples.values())
+    return round(wait / checkouts, 3)
+
+
+def run_load(
+    mix=DEFAULT_MIX,
+    requests=2000,
+    concurrency=None,
+    rate=None,
+    port=5050,
+    processes=None,
+    url=None,
+    harakiri=None,
+):
+    """
+    Run the load test against `url`, or a local uwsgi started for the run.
+    """
+    server = None
+
+    if url is None:
+        server = Server(port, processes, harakiri=harakiri)
+        url = server.url
+
+    try:
+        if server is not None:
+            server.wait()
+
+        loop = asyncio.get_event_loop()
+        results, elapsed, samples = loop.run_until_complete(
+            load(url, mix, requests, concurrency, rate)
+        )
+
+        stats = summarize(results, elapsed)
+        stats.update(
+            harakiris=server.harakiris() if server is not None else None,
+            pool_saturation=saturation(samples),
+            pool_wait_avg_ms=pool_wait_avg(samples),
+            pool_wait_max_ms=max(
+                (sample.get("checkout_wait_max_ms", 0) for sample in samples.values()),
+                default=None,
+            ),
+            workers=len(samples),
+        )
+
+        return stats
+
+    finally:
+        if server is not None:
+            server.stop()
+
@@ -0,0 +1,348 @@
+"""
+Prometheus metrics shared by every uwsgi worker.
+
+Each process writes its values to its own memory-mapped file in
+`METRICS_DIR`, `/metrics` sums the files of every process, dead workers
+included, so counters keep growing when workers are respawned.
+The directory is emptied by the uwsgi master before forking
+(`clear_metrics`).
+
+Exposed metrics:
+
+    http_requests_total{route, method, status}
+    http_request_duration_seconds{route, method}        histogram
+    http_request_db_seconds_total{route}
+    http_request_db_queries_total{route}
+    db_pool_checkouts_total, db_pool_checkout_wait_seconds_total
+    cache_hits_total{cache}, cache_misses_total{cache}
+"""
+import glob
+import json
+import mmap
+import os
+import struct
+from collections import defaultdict
+from time import perf_counter
+
+from flask import Response, current_app, g, request
+
+from core.dates import cache_info as dates_cache_info
+from core.models.base import db
+from core.models.pool import CheckoutTimerMixin
+from core.schema import compiled_schemas_info
+from core.timing import get_timings
+
+
+BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf")
+)
+
+METRICS = dict(
+    http_requests_total=("counter", "Requests handled."),
+    http_request_duration_seconds=("histogram", "Request handling duration."),
+    http_request_db_seconds_total=("counter", "Time spent in database queries."),
+    http_request_db_queries_total=("counter", "Database queries executed."),
+    db_pool_checkouts_total=("counter", "Connections checked out of the pool."),
+    db_pool_checkout_wait_seconds_total=(
+        "counter",
+        "Time spent waiting for a pool connection.",
+    ),
+    cache_hits_total=("counter", "Cache hits."),
+    cache_misses_total=("counter", "Cache misses."),
+)
+
+
+class MmapValues:
+    """
+    Float values keyed by strings in a file written by a single process.
+
+    The file starts with the number of used bytes (padded to 8 bytes),
+    followed by `(key length, key, value)` entries, values being
+    8 bytes aligned.
+    """
+
+    initial_size = 64 * 1024
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "a+b")
+
+        size = os.fstat(self._file.fileno()).st_size
+
+        if size == 0:
+            self._file.truncate(self.initial_size)
+            size = self.initial_size
+
+        self._capacity = size
+        self._mmap = mmap.mmap(self._file.fileno(), size)
+        self._positions = {}
+        self._used = struct.unpack_from("i", self._mmap, 0)[0] or 8
+
+        for key, _, position in iter_entries(self._mmap, self._used):
+            self._positions[key] = position
+
+    def _add(self, key):
+        encoded = key.encode()
+        padded = encoded + b" " * (8 - (4 + len(encoded)) % 8)
+        size = 4 + len(padded) + 8
+
+        while self._used + size > self._capacity:
+            self._capacity *= 2
+            self._file.truncate(self._capacity)
+            self._mmap.close()
+            self._mmap = mmap.mmap(self._file.fileno(), self._capacity)
+
+        struct.pack_into(
+            f"i{len(padded)}sd", self._mmap, self._used, len(encoded), padded, 0.0
+        )
+        position = self._positions[key] = self._used + 4 + len(padded)
+
+        self._used += size
+        struct.pack_into("i", self._mmap, 0, self._used)
+
+        return position
+
+    def get(self, key):
+        position = self._positions.get(key)
+
+        if position is None:
+            return 0.0
+
+        return struct.unpack_from("d", self._mmap, position)[0]
+
+    def set(self, key, value):
+        position = self._positions.get(key)
+
+        if position is None:
+            position = self._add(key)
+
+        struct.pack_into("d", self._mmap, position, value)
+
+    def inc(self, key, amount=1.0):
+        self.set(key, self.get(key) + amount)
+
+    def close(self):
+        self._mmap.close()
+        self._file.close()
+
+
+def iter_entries(data, used):
+    position = 8
+
+    while position < used:
+        length = struct.unpack_from("i", data, position)[0]
+        key = bytes(data[position + 4 : position + 4 + length]).decode()
+        position += 4 + length + 8 - (4 + length) % 8
+
+        yield key, struct.unpack_from("d", data, position)[0], position
+
+        position += 8
+
+
+def read_values(path):
+    with open(path, "rb") as file_:
+        data = file_.read()
+
+    if len(data) < 8:
+        return
+
+    for key, value, _ in iter_entries(data, struct.unpack_from("i", data, 0)[0]):
+        yield key, value
+
+
+def metric_key(name, **labels):
+    return json.dumps([name, sorted(labels.items())])
+
+
+_values = dict()
+
+
+def get_values(directory):
+    """
+    Values file of the current process.
+    """
+    pid = os.getpid()
+    values = _values.get(directory)
+
+    if values is None or values.pid != pid:
+        os.makedirs(directory, exist_ok=True)
+
+        values = MmapValues(os.path.join(directory, f"metrics-{pid}.db"))
+        values.pid = pid
+        _values[directory] = values
+
+    return values
+
+
+def clear_metrics(app):
+    """
+    Remove the files of previous processes, to call before forking workers.
+    """
+    for path in glob.glob(os.path.join(app.config["METRICS_DIR"], "metrics-*.db")):
+        os.remove(path)
+
+
+def collect(directory):
+    """
+    Sum the values of every process.
+    """
+    totals = defaultdict(float)
+
+    for path in glob.glob(os.path.join(directory, "metrics-*.db")):
+        for key, value in read_values(path):
+            totals[key] += value
+
+    return totals
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+
+    return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in labels) + "}"
+
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+
+    return repr(float(value))
+
+
+def render(totals):
+    """
+    Prometheus text exposition format.
+    """
+    samples = defaultdict(list)
+
+    for key, value in totals.items():
+        name, labels = json.loads(key)
+        samples[name].append((labels, value))
+
+    lines = []
+
+    for name, (type_, description) in METRICS.items():
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {type_}")
+
+        if type_ == "histogram":
+            series = defaultdict(dict)
+
+            for labels, value in samples.get(f"{name}_bucket", []):
+                labels = dict(labels)
+                upper = float(labels.pop("le"))
+                series[tuple(sorted(labels.items()))][upper] = value
+
+            for labels, buckets in sorted(series.items()):
+                count = 0.0
+
+                for upper in BUCKETS:
+                    count += buckets.get(upper, 0.0)
+                    le = format_labels(labels + (("le", format_value(upper)),))
+                    lines.append(f"{name}_bucket{le} {format_value(count)}")
+
+                for suffix in ("sum", "count"):
+                    key = metric_key(f"{name}_{suffix}", **dict(labels))
+                    value = totals.get(key, 0)
+                    lines.append(
+                        f"{name}_{suffix}{format_labels(labels)} {format_value(value)}"
+                    )
+
+            continue
+
+        for labels, value in sorted(samples.get(name, [])):
+            lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+
+    return "\n".join(lines) + "\n"
+
+
+def caches_info():
+    yield "compiled_schemas", compiled_schemas_info()
+
+    for name, info in dates_cache_info().items():
+        yield name, dict(hits=info.hits, misses=info.misses)
+
+
+def start_request():
+    g._metrics_start = perf_counter()
+
+
+def record_request(response):
+    start = g.get("_metrics_start")
+
+    if start is None:
+        return response
+
+    values = get_values(current_app.config["METRICS_DIR"])
+    duration = perf_counter() - start
+
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    method = request.method
+
+    values.inc(
+        metric_key(
+            "http_requests_total",
+            route=route,
+            method=method,
+            status=response.status_code,
+        )
+    )
+
+    for upper in BUCKETS:
+        if duration <= upper:
+            break
+
+    labels = dict(route=route, method=method)
+
+    values.inc(
+        metric_key(
+            "http_request_duration_seconds_bucket", le=format_value(upper), **labels
+        )
+    )
+    values.inc(metric_key("http_request_duration_seconds_sum", **labels), duration)
+    values.inc(metric_key("http_request_duration_seconds_count", **labels))
+
+    timings = get_timings()
+
+    if timings is not None:
+        metrics = timings.metrics()
+        values.inc(
+            metric_key("http_request_db_seconds_total", route=route), metrics["db"]
+        )
+        values.inc(
+            metric_key("http_request_db_queries_total", route=route),
+            metrics["db_count"],
+        )
+
+    # Cumulative per process values
+    pool = db.engine.pool
+
+    if isinstance(pool, CheckoutTimerMixin):
+        values.set(metric_key("db_pool_checkouts_total"), pool.checkouts)
+        values.set(
+            metric_key("db_pool_checkout_wait_seconds_total"), pool.checkout_wait
+        )
+
+    for cache, info in caches_info():
+        values.set(metric_key("cache_hits_total", cache=cache), info["hits"])
+        values.set(metric_key("cache_misses_total", cache=cache), info["misses"])
+
+    return response
+
+
+def metrics():
+    totals = collect(current_app.config["METRICS_DIR"])
+    return Response(render(totals), mimetype="text/plain; version=0.0.4")
+
+
+def init_metrics(app):
+    if not app.config.get("METRICS_ENABLED", True):
+        return
+
+    app.before_request(start_request)
+    app.after_request(record_request)
+    app.add_url_rule("/metrics", "metrics", metrics)
@@ -0,0 +1,255 @@
+"""
+On demand request profiling.
+
+With `PROFILING_ENABLED`, a request is profiled when it carries a valid
+`X-Profile` header or is drawn by `PROFILING_SAMPLE_RATE`. The header
+value is `<timestamp>:<signature>`, the signature is the HMAC-SHA256 of
+`<timestamp>:<path>` keyed by `PROFILING_SECRET` and expires after
+`PROFILING_SIGNATURE_MAX_AGE` seconds (see `sign`):
+
+    TIMESTAMP=$(date +%s)
+    curl -H "X-Profile: $TIMESTAMP:$(printf $TIMESTAMP:/users/1 | \\
+        openssl dgst -sha256 -hmac $PROFILING_SECRET -r | cut -d' ' -f1)" \\
+        .../users/1
+
+The request runs under cProfile, and tracemalloc when
+`PROFILING_TRACEMALLOC` is enabled or the request sends
+`X-Profile-Memory: 1`. `PROFILING_DIR` receives, per request:
+
+    <id>.prof         cProfile stats, readable with `pstats`
+    <id>.alloc.json   allocation sites that grew during the request
+    <id>.json         route, path, duration
+
+The id is returned in the `X-Profile-Id` response header,
+`flask perf profiles` summarizes them per route. The profiler and
+tracemalloc are stopped on teardown, also when the view raises.
+"""
+import cProfile
+import glob
+import hmac
+import json
+import os
+import pstats
+import random
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime
+from hashlib import sha256
+from io import StringIO
+from time import perf_counter, time
+
+from flask import current_app, g, request
+
+
+def sign(secret, path, timestamp=None):
+    """
+    `X-Profile` header value for `path`, signed at `timestamp` (now).
+    """
+    timestamp = int(time() if timestamp is None else timestamp)
+    message = f"{timestamp}:{path}".encode()
+
+    return f"{timestamp}:{hmac.new(secret.encode(), message, sha256).hexdigest()}"
+
+
+def verify(secret, path, value, max_age):
+    timestamp, _, _ = value.partition(":")
+
+    try:
+        timestamp = int(timestamp)
+
+    except ValueError:
+        return False
+
+    if abs(time() - timestamp) > max_age:
+        return False
+
+    return hmac.compare_digest(value, sign(secret, path, timestamp))
+
+
+def should_profile(config):
+    signature = request.headers.get("X-Profile")
+    secret = config.get("PROFILING_SECRET")
+
+    if signature and secret:
+        return verify(
+            secret,
+            request.path,
+            signature,
+            config.get("PROFILING_SIGNATURE_MAX_AGE", 300),
+        )
+
+    sample_rate = config.get("PROFILING_SAMPLE_RATE", 0)
+
+    return sample_rate > 0 and random.random() < sample_rate
+
+
+def start_profiling():
+    config = current_app.config
+
+    if not should_profile(config):
+        return
+
+    memory = (
+        config.get("PROFILING_TRACEMALLOC")
+        or request.headers.get("X-Profile-Memory") == "1"
+    )
+    state = g._profiling = dict(start=perf_counter(), snapshot=None, tracing=False)
+
+    if memory:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            state["tracing"] = True
+
+        state["snapshot"] = tracemalloc.take_snapshot()
+
+    profiler = state["profiler"] = cProfile.Profile()
+    profiler.enable()
+
+
+def allocation_diff(before, after, limit=50):
+    filters = [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+    ]
+    before = before.filter_traces(filters)
+    after = after.filter_traces(filters)
+
+    return [
+        dict(
+            file=stat.traceback[0].filename,
+            line=stat.traceback[0].lineno,
+            size_diff=stat.size_diff,
+            count_diff=stat.count_diff,
+        )
+        for stat in after.compare_to(before, "lineno")[:limit]
+        if stat.size_diff > 0
+    ]
+
+
+def dump_profile(response):
+    state = g.get("_profiling")
+
+    if state is None:
+        return response
+
+    state["profiler"].disable()
+    duration = perf_counter() - state["start"]
+
+    directory = current_app.config["PROFILING_DIR"]
+    os.makedirs(directory, exist_ok=True)
+
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    profile_id = "{}-{}-{}".format(
+        datetime.utcnow().strftime("%Y%m%dT%H%M%S%f"),
+        os.getpid(),
+        (request.endpoint or "unmatched").replace(".", "-"),
+    )
+    path = os.path.join(directory, profile_id)
+
+    state["profiler"].dump_stats(f"{path}.prof")
+
+    if state["snapshot"] is not None:
+        allocations = allocation_diff(state["snapshot"], tracemalloc.take_snapshot())
+
+        with open(f"{path}.alloc.json", "w") as file_:
+            json.dump(allocations, file_)
+
+    with open(f"{path}.json", "w") as file_:
+        json.dump(
+            dict(
+                id=profile_id,
+                route=route,
+                method=request.method,
+                path=request.full_path,
+                status=response.status_code,
+                duration_ms=round(duration * 1000, 3),
+            ),
+            file_,
+        )
+
+    response.headers["X-Profile-Id"] = profile_id
+
+    return response
+
+
+def stop_profiling(exc=None):
+    """
+    Teardown handler, `after_request` handlers don't run when the view
+    raises with `PROPAGATE_EXCEPTIONS`.
+    """
+    state = g.pop("_profiling", None)
+
+    if state is None:
+        return
+
+    state["profiler"].disable()
+
+    if state["tracing"]:
+        tracemalloc.stop()
+
+
+def init_profiling(app):
+    if not app.config.get("PROFILING_ENABLED"):
+        return
+
+    if start_profiling in app.before_request_funcs.get(None, ()):
+        return
+
+    app.before_request(start_profiling)
+    app.after_request(dump_profile)
+    app.teardown_request(stop_profiling)
+
+
+def list_profiles(directory, route=None):
+    """
+    Metadata of the profiles in `directory`, oldest first.
+    """
+    profiles = []
+
+    for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        if path.endswith(".alloc.json"):
+            continue
+
+        with open(path) as file_:
+            meta = json.load(file_)
+
+        if route is None or meta["route"] == route:
+            profiles.append(meta)
+
+    return profiles
+
+
+def summarize_functions(directory, profiles, sort="cumulative", limit=20):
+    """
+    `pstats` report of the merged `profiles`.
+    """
+    stream = StringIO()
+    paths = [os.path.join(directory, f"{meta['id']}.prof") for meta in profiles]
+    stats = pstats.Stats(*paths, stream=stream)
+
+    stats.sort_stats(sort).print_stats(limit)
+
+    return stream.getvalue()
+
+
+def summarize_allocations(directory, profiles, limit=20):
+    """
+    Allocation sites of `profiles`, by total growth.
+    """
+    totals = defaultdict(lambda: dict(size_diff=0, count_diff=0, requests=0))
+
+    for meta in profiles:
+        path = os.path.join(directory, f"{meta['id']}.alloc.json")
+
+        if not os.path.exists(path):
+            continue
+
+        with open(path) as file_:
+            for allocation in json.load(file_):
+                total = totals[f"{allocation['file']}:{allocation['line']}"]
+                total["size_diff"] += allocation["size_diff"]
+                total["count_diff"] += allocation["count_diff"]
+                total["requests"] += 1
+
+    sites = sorted(totals.items(), key=lambda item: item[1]["size_diff"], reverse=True)
+    return sites[:limit]
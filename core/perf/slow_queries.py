@@ -0,0 +1,204 @@
+"""
+Slow query log.
+
+Statements running longer than `SLOW_QUERY_THRESHOLD` milliseconds are
+written to `SLOW_QUERY_LOG`, a rotating JSON lines file, with their
+parameters, route and duration. A `SLOW_QUERY_SAMPLE_RATE` share of the
+slow `SELECT` statements is run again under
+`EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)` to capture the plan, in a
+read-only savepoint always rolled back so it has no side effect.
+
+`flask perf slow-queries` summarizes the worst offenders.
+"""
+import json
+import os
+import random
+import re
+from collections import defaultdict
+from datetime import datetime
+from logging import INFO, Formatter, getLogger
+from logging.handlers import RotatingFileHandler
+from time import perf_counter
+
+from flask import current_app, has_app_context, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+logger = getLogger(__name__)
+
+_handlers = dict()
+
+
+def get_slow_query_logger(path, max_bytes, backup_count):
+    """
+    Logger writing raw lines to `path`, one per process and path.
+    """
+    slow_logger = getLogger(f"{__name__}.{path}")
+
+    if path not in _handlers:
+        handler = RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backup_count, delay=True
+        )
+        handler.setFormatter(Formatter("%(message)s"))
+
+        slow_logger.addHandler(handler)
+        slow_logger.setLevel(INFO)
+        slow_logger.propagate = False
+
+        _handlers[path] = handler
+
+    return slow_logger
+
+
+def explain(conn, statement, parameters):
+    """
+    Run `statement` again under `EXPLAIN ANALYZE` in a savepoint, on the
+    raw DBAPI connection so no event is triggered. The savepoint is read
+    only (`nextval()`, `FOR UPDATE`... fail) and always rolled back.
+    """
+    cursor = conn.connection.cursor()
+
+    try:
+        cursor.execute("SAVEPOINT slow_query_explain")
+
+        try:
+            cursor.execute("SET LOCAL transaction_read_only = on")
+            cursor.execute(
+                f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}", parameters
+            )
+            plan = cursor.fetchone()[0]
+
+        finally:
+            # Also restores `transaction_read_only`.
+            cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+            cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+
+        return plan[0] if isinstance(plan, list) else plan
+
+    finally:
+        cursor.close()
+
+
+def is_select(statement):
+    # Not `WITH`, its queries can modify data.
+    return re.match(r"^\s*SELECT\b", statement, re.IGNORECASE) is not None
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # On the execution context, a failed statement never reaches
+    # `after_cursor_execute`.
+    context._slow_query_start = perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = perf_counter() - context._slow_query_start
+
+    if not has_app_context():
+        return
+
+    config = current_app.config
+    threshold = config.get("SLOW_QUERY_THRESHOLD")
+
+    if threshold is None or duration * 1000 < threshold:
+        return
+
+    record = dict(
+        time=datetime.utcnow().isoformat(),
+        pid=os.getpid(),
+        duration_ms=round(duration * 1000, 3),
+        statement=statement,
+        parameters=parameters,
+        route=request.endpoint if has_request_context() else None,
+        path=request.full_path if has_request_context() else None,
+        plan=None,
+    )
+
+    sample_rate = config.get("SLOW_QUERY_SAMPLE_RATE", 1.0)
+
+    if (
+        not executemany
+        and is_select(statement)
+        and sample_rate > 0
+        and random.random() < sample_rate
+    ):
+        try:
+            record["plan"] = explain(conn, statement, parameters)
+
+        except Exception as exc:
+            logger.warning(f"Could not explain slow query: {exc}")
+
+    slow_logger = get_slow_query_logger(
+        config["SLOW_QUERY_LOG"],
+        config.get("SLOW_QUERY_LOG_MAX_BYTES", 10 * 1024 * 1024),
+        config.get("SLOW_QUERY_LOG_BACKUP_COUNT", 5),
+    )
+    slow_logger.info(json.dumps(record, default=str))
+
+
+def init_slow_queries(app):
+    if app.config.get("SLOW_QUERY_THRESHOLD") is None:
+        return
+
+    for name, listener in (
+        ("before_cursor_execute", before_cursor_execute),
+        ("after_cursor_execute", after_cursor_execute),
+    ):
+        if not event.contains(Engine, name, listener):
+            event.listen(Engine, name, listener)
+
+
+def read_records(path):
+    """
+    Records of `path` and its rotated files, oldest first.
+    """
+    paths = [path]
+    index = 1
+
+    while os.path.exists(f"{path}.{index}"):
+        paths.insert(0, f"{path}.{index}")
+        index += 1
+
+    for path_ in paths:
+        if not os.path.exists(path_):
+            continue
+
+        with open(path_) as file_:
+            for line in file_:
+                try:
+                    yield json.loads(line)
+
+                except ValueError:
+                    continue
+
+
+def summarize(records, limit=10):
+    """
+    Group records by statement, sorted by total time.
+    """
+    groups = defaultdict(list)
+
+    for record in records:
+        groups[" ".join(record["statement"].split())].append(record)
+
+    summary = []
+
+    for statement, group in groups.items():
+        durations = [record["duration_ms"] for record in group]
+        worst = max(group, key=lambda record: record["duration_ms"])
+
+        summary.append(
+            dict(
+                statement=statement,
+                count=len(group),
+                total_ms=round(sum(durations), 3),
+                average_ms=round(sum(durations) / len(durations), 3),
+                max_ms=worst["duration_ms"],
+                routes=sorted({record["route"] or "-" for record in group}),
+                worst=worst,
+            )
+        )
+
+    summary.sort(key=lambda item: item["total_ms"], reverse=True)
+
+    return summary[:limit]
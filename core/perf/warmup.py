@@ -0,0 +1,120 @@
+"""
+Warm the application up in the uwsgi master, before workers are forked.
+
+Without it, the first request of each worker configures the mappers,
+builds the marshmallow schemas and their generated dumpers, runs the
+flask-restplus and first request setup... Done once in the master, the
+workers inherit that state copy-on-write (`gc.freeze` keeps the garbage
+collector from touching, and so copying, those pages).
+
+The warmup sends a request to each of `WARMUP_PATHS` through the test
+client, for a user and a merchant having transactions. The master's
+connections are closed before forking, each worker opens its own on
+`postfork` (`connect`).
+"""
+import gc
+from logging import getLogger
+from time import perf_counter
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import configure_mappers
+
+from core.models.base import db, session
+from core.schema import get_class_by_table
+
+
+logger = getLogger(__name__)
+
+WARMUP_PATHS = (
+    "/users/{user_id}",
+    "/users/{user_id}/average",
+    "/users/{user_id}/average/2019/1",
+    "/merchants/{merchant_id}",
+    "/merchants/{merchant_id}/average",
+    "/merchants/{merchant_id}/average/2019/1",
+)
+
+
+def get_entities():
+    """
+    Ids of a user and a merchant with transactions, 1 when there are none.
+    """
+    from core.models.all import Transaction
+
+    entities = dict(user_id=1, merchant_id=1)
+    row = (
+        session.query(Transaction.user_id, Transaction.merchant_id)
+        .filter(Transaction.merchant_id.isnot(None))
+        .first()
+    )
+
+    if row is not None:
+        entities.update(user_id=row.user_id, merchant_id=row.merchant_id)
+
+    return entities
+
+
+def warmup(app, paths=None, dispose=True, freeze=True):
+    """
+    Build the lazily initialized state of `app` and return the
+    `{path: (status, milliseconds)}` of the warmup requests.
+    """
+    start = perf_counter()
+    paths = paths or WARMUP_PATHS
+    results = {}
+
+    configure_mappers()
+
+    # Builds the table to model index used by foreign key fields.
+    get_class_by_table(None)
+
+    try:
+        with app.app_context():
+            entities = get_entities()
+            session.remove()
+
+    except SQLAlchemyError as exc:
+        logger.warning(f"Warmup could not query the database: {exc}")
+        entities = dict(user_id=1, merchant_id=1)
+
+    client = app.test_client()
+
+    for path in paths:
+        path = path.format(**entities)
+        request_start = perf_counter()
+        response = client.get(path)
+
+        results[path] = (
+            response.status_code,
+            round((perf_counter() - request_start) * 1000, 3),
+        )
+
+        if response.status_code != 200:
+            logger.warning(f"Warmup request {path} answered {response.status_code}")
+
+    if dispose:
+        with app.app_context():
+            session.remove()
+            db.get_engine(app).dispose()
+
+    if freeze:
+        gc.collect()
+        gc.freeze()
+
+    logger.info(
+        f"Warmed up in {(perf_counter() - start) * 1000:.0f}ms "
+        f"({len(results)} requests)"
+    )
+
+    return results
+
+
+def connect(app):
+    """
+    Open the first pool connection of a forked worker.
+    """
+    try:
+        db.get_engine(app).connect().close()
+
+    except SQLAlchemyError as exc:
+        logger.warning(f"Warmup could not connect to the database: {exc}")
@@ -2,12 +2,11 @@
 import datetime
 import logging
 import uuid
+from collections import defaultdict
 from copy import copy
 
-import schwifty
-from flask import g, request, current_app
-from pycountry import currencies
-from marshmallow import post_load
+from flask import abort, g, request, current_app, has_app_context, has_request_context
+from marshmallow import post_load, pre_load
 from marshmallow.schema import Schema as BaseSchema
 from marshmallow.fields import (
     DateTime as BaseDateTime,
@@ -25,13 +24,11 @@ from marshmallow.exceptions import ValidationError
 from marshmallow_sqlalchemy import ModelSchema as BaseModelSchema
 from marshmallow_sqlalchemy.convert import ModelConverter as BaseModelConverter
 from marshmallow_sqlalchemy.schema import ModelSchemaOpts as BaseModelSchemaOpts
-from phonenumbers import parse as parse_number, NumberParseException
-from pycountry import countries
-from sqlalchemy.orm.exc import NoResultFound
+from sqlalchemy import inspect
 from sqlalchemy_utils import EmailType, URLType, UUIDType
 from sqlalchemy.dialects.postgresql import JSON
 
-from core.dates import parse_iso_datetime, format_iso_datetime
+from core.dates import parse_iso_date, parse_iso_datetime, format_iso_datetime
 from core.models.base import (
     GUID,
     Model,
@@ -75,12 +72,10 @@ class OffsetDateTime(DateTime):
 
 class Date(BaseDate):
     def _deserialize(self, value, attr, data):
-        value = value.replace("/", "-")
-
         try:
-            return datetime.datetime.strptime(value, "%Y-%m-%d").date()
+            return parse_iso_date(value.replace("/", "-"))
 
-        except ValueError:
+        except (AttributeError, ValueError):
             self.fail("invalid")
 
 
@@ -94,6 +89,8 @@ class PhoneNumber(String):
     default_error_messages = phone_number_messages
 
     def _deserialize(self, value, attr, data):
+        from phonenumbers import parse as parse_number, NumberParseException
+
         value = value.replace(" ", "")
 
         try:
@@ -111,6 +108,8 @@ class Iban(String):
     """
 
     def _deserialize(self, value, attr, obj):
+        import schwifty
+
         try:
             return str(schwifty.IBAN(value))
 
@@ -124,6 +123,8 @@ class Bic(String):
     """
 
     def _deserialize(self, value, attr, obj):
+        import schwifty
+
         try:
             return schwifty.BIC(value)
 
@@ -145,6 +146,8 @@ class Country(String):
     """
 
     def _deserialize(self, value, attr, obj):
+        from pycountry import countries
+
         try:
             length = len(value)
 
@@ -207,6 +210,8 @@ class Currency(String):
     """
 
     def _deserialize(self, value, attr, obj):
+        from pycountry import currencies
+
         try:
             currency = currencies.get(alpha_3=value)
             return currency.alpha_3
@@ -243,12 +248,53 @@ class PrefixedProcessingMixin:
         return data
 
 
+_classes_by_table = dict()
+
+
 def get_class_by_table(table_name):
     """Return first class found mapped to given table.
     """
-    for class_ in Model._decl_class_registry.values():
-        if hasattr(class_, "__table__") and class_.__table__.fullname == table_name:
-            return class_
+    try:
+        return _classes_by_table[table_name]
+
+    except KeyError:
+        # Classes may have been declared since the index was built.
+        _classes_by_table.clear()
+
+        for class_ in Model._decl_class_registry.values():
+            if hasattr(class_, "__table__"):
+                _classes_by_table.setdefault(class_.__table__.fullname, class_)
+
+        return _classes_by_table.get(table_name)
+
+
+def fetch_foreign_keys(foreign_key, values):
+    """
+    Load the rows referenced by `values` through `foreign_key` with a single
+    query. Found rows are cached for the rest of the request (when there is
+    an application context), returns the `{str(value): row}` cache.
+    """
+    if has_app_context():
+        cache = g.setdefault("_foreign_keys", dict()).setdefault(foreign_key, dict())
+
+    else:
+        cache = dict()
+
+    missing = {str(value) for value in values} - cache.keys()
+
+    if not missing:
+        return cache
+
+    model = get_class_by_table(foreign_key.table.fullname)
+    attribute = inspect(model).get_property_by_column(foreign_key).key
+
+    query = db_session.query(model).filter(foreign_key.in_(sorted(missing)))
+
+    with db_session.no_autoflush:
+        for result in query:
+            cache[str(getattr(result, attribute))] = result
+
+    return cache
 
 
 class Url(BaseUrl):
@@ -260,35 +306,47 @@ class Url(BaseUrl):
 
 
 class UUID(BaseUUID):
-    def _deserialize(self, value, attr, obj):
+    @property
+    def checks_foreign_key(self):
+        """
+        Whether loaded values must reference an existing row.
+        """
+        return getattr(self, "foreign_key", None) is not None and not self.validators
+
+    def get_foreign_key_value(self, value):
         foreign_key = self.foreign_key
-        validators = self.validators
 
         if foreign_key is not None and isinstance(value, dict):
             _value = value.get(foreign_key.key)
             value = _value if _value else value
-        value = super()._deserialize(value, attr, obj)
-        if foreign_key is not None and value is not None and len(validators) == 0:
-            model = get_class_by_table(foreign_key.table.fullname)
 
-            query = db_session.query(model).filter(foreign_key == str(value))
+        return value
 
-            try:
-                with db_session.no_autoflush:
-                    result = query.one()
+    def _deserialize(self, value, attr, obj):
+        foreign_key = self.foreign_key
 
-                    if self.is_relationship:
-                        return result
+        value = super()._deserialize(self.get_foreign_key_value(value), attr, obj)
+        if value is not None and self.checks_foreign_key:
+            result = fetch_foreign_keys(foreign_key, [value]).get(str(value))
 
-            except NoResultFound:
+            if result is None:
                 raise ValidationError("Does not exist.")
+
+            if self.is_relationship:
+                return result
         return value
 
     def _serialize(self, value, *args):
         if isinstance(value, Model):
             if self.embedded:
-                if self._schema_class:
-                    return self._schema_class().dump(value).data
+                schema_class = self._schema_class
+
+                if schema_class:
+                    if hasattr(schema_class, "compiled"):
+                        return schema_class.compiled().dump(value).data
+
+                    return schema_class().dump(value).data
+
                 return value.serialize()
 
             value = value.id
@@ -548,6 +606,152 @@ def check_roles(field, role=None):
     return field
 
 
+def freeze(value):
+    """
+    Make schema options hashable.
+    """
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(freeze(item) for item in value)
+
+    if isinstance(value, dict):
+        return tuple(sorted((key, freeze(item)) for key, item in value.items()))
+
+    return value
+
+
+def get_effective_role(role=None):
+    if role is None and has_app_context():
+        role = getattr(g.get("user"), "role", None)
+
+    if role is None:
+        return None
+
+    return get_enum_value(role)
+
+
+_compiled_schemas = dict()
+_compiled_schemas_stats = dict(hits=0, misses=0)
+
+
+def clear_compiled_schemas():
+    _compiled_schemas.clear()
+
+
+def compiled_schemas_info():
+    return dict(_compiled_schemas_stats, size=len(_compiled_schemas))
+
+
+def get_requested_fields(schema, value=None):
+    """
+    Names of the `schema` fields requested with the `fields` query
+    parameter (comma separated), `None` when every field is wanted.
+    Aborts with a 400 on unknown names.
+    """
+    if value is None and has_request_context():
+        value = request.args.get("fields")
+
+    names = {name.strip() for name in (value or "").split(",")} - {""}
+
+    if not names:
+        return None
+
+    unknown = names - {
+        name for name, field in schema.fields.items() if not field.load_only
+    }
+
+    if unknown:
+        abort(400, f"Unknown fields: {', '.join(sorted(unknown))}.")
+
+    return tuple(sorted(names))
+
+
+def get_related_schema(field, model):
+    """
+    Schema used to dump related `model` instances of `field`,
+    `None` when unknown.
+    """
+    if isinstance(field, Nested):
+        return field.schema
+
+    if isinstance(field, UUID) and not field.embedded:
+        return None
+
+    schema_class = getattr(field, "_schema_class", None)
+
+    if schema_class is not None:
+        if hasattr(schema_class, "compiled"):
+            return schema_class.compiled()
+
+        return schema_class()
+
+    if model.serialize is not Model.serialize:
+        return None
+
+    if hasattr(getattr(model, "schema_class", None), "compiled"):
+        return model.schema_class.compiled()
+
+    try:
+        return model.get_schema()
+
+    except NotImplementedError:
+        return None
+
+
+def eager_load_paths(schema, mapper, path=()):
+    """
+    Relationship paths read when dumping instances of `mapper` with
+    `schema` (nested, embedded and `ForeignField` values), as tuples of
+    relationship properties, parents first.
+    """
+    paths = []
+
+    for name, field in schema.fields.items():
+        if field.load_only:
+            continue
+
+        if isinstance(field, List):
+            field = field.container
+
+        if isinstance(field, ForeignField):
+            keys = field.path.split(".")
+
+        elif isinstance(field, (UUID, Nested)):
+            keys = [field.attribute or name]
+
+        else:
+            continue
+
+        current_mapper, current_path = mapper, path
+
+        for key in keys:
+            prop = current_mapper.relationships.get(key)
+
+            # Don't follow back references.
+            if prop is None or any(
+                prop is parent or prop in parent._reverse_property
+                for parent in current_path
+            ):
+                break
+
+            current_path += (prop,)
+            current_mapper = prop.mapper
+
+            if current_path not in paths:
+                paths.append(current_path)
+
+        else:
+            related_schema = get_related_schema(field, current_mapper.class_)
+
+            if related_schema is not None:
+                for related_path in eager_load_paths(
+                    related_schema, current_mapper, current_path
+                ):
+                    if related_path not in paths:
+                        paths.append(related_path)
+
+    return paths
+
+
 class ModelSchema(BaseModelSchema):
     TYPE_MAPPING = model_type_mapping
     OPTIONS_CLASS = ModelSchemaOpts
@@ -557,6 +761,38 @@ class ModelSchema(BaseModelSchema):
         super().__init__(*args, **kwargs)
         self.load_roles(role=effective_role)
 
+    @classmethod
+    def compiled(cls, effective_role=None, **kwargs):
+        """
+        Return a schema instance built once per effective role, HTTP method
+        and options. Instances are shared by every request of the process,
+        they must not be mutated.
+        """
+        if "context" in kwargs:
+            return cls(effective_role=effective_role, **kwargs)
+
+        if "only" in kwargs and kwargs["only"] is None:
+            del kwargs["only"]
+
+        method = request.method.lower() if has_request_context() else None
+        options = freeze(kwargs) if kwargs else ()
+        key = (cls, get_effective_role(effective_role), method, options)
+
+        try:
+            schema = _compiled_schemas[key]
+            _compiled_schemas_stats["hits"] += 1
+            return schema
+
+        except KeyError:
+            _compiled_schemas_stats["misses"] += 1
+            schema = cls(effective_role=effective_role, **kwargs)
+            _compiled_schemas[key] = schema
+            return schema
+
+        except TypeError:
+            # Unhashable options
+            return cls(effective_role=effective_role, **kwargs)
+
     def load_roles(self, role=None):
         for key, field in self.fields.copy().items():
             field = check_roles(field, role)
@@ -571,6 +807,63 @@ class ModelSchema(BaseModelSchema):
     def session(self):
         return db_session
 
+    def eager_load_paths(self):
+        """
+        Relationships to eager load before dumping, see `Query.eager_load`.
+        """
+        try:
+            return self._eager_load_paths
+
+        except AttributeError:
+            self._eager_load_paths = eager_load_paths(self, inspect(self.opts.model))
+            return self._eager_load_paths
+
+    @pre_load(pass_many=True)
+    def prefetch_foreign_keys(self, data, many):
+        """
+        Check the foreign keys of the whole payload with one query
+        per referenced column, `UUID` fields then hit the request cache.
+        """
+        values = defaultdict(set)
+
+        for name, field in self.fields.items():
+            if field.dump_only:
+                continue
+
+            is_list = isinstance(field, List)
+
+            if is_list:
+                field = field.container
+
+            if not isinstance(field, UUID) or not field.checks_foreign_key:
+                continue
+
+            key = field.load_from or name
+
+            for item in data if many else [data]:
+                if not isinstance(item, dict):
+                    continue
+
+                items = item.get(key)
+
+                if not is_list or not isinstance(items, list):
+                    items = [items]
+
+                for value in items:
+                    try:
+                        value = field._validated(field.get_foreign_key_value(value))
+
+                    except ValidationError:
+                        continue
+
+                    if value is not None:
+                        values[field.foreign_key].add(value)
+
+        for foreign_key, keys in values.items():
+            fetch_foreign_keys(foreign_key, keys)
+
+        return data
+
     @post_load
     def make_instance(self, data):
         data = PrefixedProcessingMixin.process_prefixed(self, data)
@@ -1,8 +1,13 @@
 import os
+import re
 from contextlib import contextmanager
+from time import perf_counter
 
 import arrow
+import pytest
 from flask import g
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 
 
 def assert_datetime_equals(value, target):
@@ -47,3 +52,56 @@ def assert_schema(class_, app, user, dump_only, writable=None, method="post"):
         )
 
     return schema
+
+
+# Statements issued by the nested transaction of the `session` fixture.
+_savepoint_statement = re.compile(r"^\s*(RELEASE |ROLLBACK TO )?SAVEPOINT", re.I)
+
+
+class QueryBudget:
+    def __init__(self):
+        self.statements = []
+        self.duration = None
+
+    def __call__(self, conn, cursor, statement, *args):
+        if not _savepoint_statement.match(statement):
+            self.statements.append(statement)
+
+    def __len__(self):
+        return len(self.statements)
+
+
+@contextmanager
+def query_budget(max_queries=None, max_ms=None):
+    """
+    Fail the test when the block runs more than `max_queries` statements
+    or takes longer than `max_ms` milliseconds.
+
+        with query_budget(max_queries=2):
+            client.get("/users/1")
+
+    Route tests only set `max_queries`, wall-clock limits fail at random on
+    loaded machines and under pytest-xdist.
+    """
+    budget = QueryBudget()
+    event.listen(Engine, "before_cursor_execute", budget)
+    start = perf_counter()
+
+    try:
+        yield budget
+
+    finally:
+        budget.duration = (perf_counter() - start) * 1000
+        event.remove(Engine, "before_cursor_execute", budget)
+
+    if max_queries is not None and len(budget) > max_queries:
+        pytest.fail(
+            f"{len(budget)} queries executed, budget is {max_queries}:\n"
+            + "\n\n".join(budget.statements),
+            pytrace=False,
+        )
+
+    if max_ms is not None and budget.duration > max_ms:
+        pytest.fail(
+            f"Took {budget.duration:.1f}ms, budget is {max_ms}ms", pytrace=False
+        )
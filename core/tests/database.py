@@ -0,0 +1,123 @@
+"""
+Template databases for the test suite.
+
+Migrating and seeding the test database takes seconds, cloning it with
+`CREATE DATABASE ... TEMPLATE` takes milliseconds. The template is built
+once per version of the files it is made from (its name ends with their
+hash) and each pytest-xdist worker gets its own clone:
+
+    <test database>_template_<hash>     migrated and seeded
+    <test database>_<worker>            clone used by a test session
+"""
+import hashlib
+import os
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine.url import make_url
+
+
+def fingerprint(paths):
+    """
+    Hash of the names and contents of the files at `paths`.
+    """
+    digest = hashlib.sha256()
+
+    for path in sorted(paths):
+        digest.update(os.path.basename(path).encode())
+
+        with open(path, "rb") as file_:
+            digest.update(file_.read())
+
+    return digest.hexdigest()[:12]
+
+
+def with_database(uri, name):
+    url = make_url(uri)
+
+    try:
+        return url.set(database=name)
+
+    except AttributeError:
+        # SQLAlchemy < 1.4 urls are mutable
+        url.database = name
+        return url
+
+
+def worker_database_name(uri):
+    worker = os.environ.get("PYTEST_XDIST_WORKER", "main")
+    return f"{make_url(uri).database}_{worker}"
+
+
+def database_exists(connection, name):
+    query = text("select 1 from pg_database where datname = :name")
+    return connection.execute(query, name=name).scalar() is not None
+
+
+def build_template(connection, uri, name, build):
+    """
+    Build the template in a temporary database renamed once complete,
+    an interrupted build is never used as a template.
+    """
+    base = make_url(uri).database
+    stale = connection.execute(
+        text("select datname from pg_database where datname like :pattern"),
+        pattern=f"{base}\\_template\\_%",
+    )
+
+    for (database,) in stale.fetchall():
+        connection.execute(f'drop database "{database}"')
+
+    building = f"{name}_build"
+
+    connection.execute(
+        f'create database "{building}" encoding \'UTF8\' template template0'
+    )
+    build(str(with_database(uri, building)))
+    connection.execute(f'alter database "{building}" rename to "{name}"')
+
+
+def clone_database(uri, build, paths):
+    """
+    Create the database of the current worker from the template made by
+    `build(uri)` and `paths`, returns its uri.
+    """
+    base = make_url(uri).database
+    template = f"{base}_template_{fingerprint(paths)}"
+    name = worker_database_name(uri)
+
+    engine = create_engine(
+        with_database(uri, "postgres"), isolation_level="AUTOCOMMIT"
+    )
+
+    try:
+        with engine.connect() as connection:
+            # Workers starting together wait for the first one to build it.
+            connection.execute(
+                text("select pg_advisory_lock(hashtext(:key))"), key=base
+            )
+
+            try:
+                if not database_exists(connection, template):
+                    build_template(connection, uri, template, build)
+
+                # Copy the files instead of WAL logging every block.
+                strategy = (
+                    " strategy file_copy"
+                    if connection.dialect.server_version_info >= (15,)
+                    else ""
+                )
+
+                connection.execute(f'drop database if exists "{name}"')
+                connection.execute(
+                    f'create database "{name}" template "{template}"{strategy}'
+                )
+
+            finally:
+                connection.execute(
+                    text("select pg_advisory_unlock(hashtext(:key))"), key=base
+                )
+
+    finally:
+        engine.dispose()
+
+    return str(with_database(uri, name))
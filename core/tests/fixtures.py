@@ -1,7 +1,17 @@
 # register here your different fixtures for testing
 import pytest
 
+from core.tests.base import query_budget as _query_budget
+
 
 @pytest.fixture(scope='session')
 def tmp_media_dir():
     return '/tmp'
+
+
+@pytest.fixture
+def query_budget():
+    """
+    `query_budget(max_queries=None, max_ms=None)` context manager.
+    """
+    return _query_budget
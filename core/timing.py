@@ -0,0 +1,144 @@
+"""
+Per request timings, returned in a `Server-Timing` header:
+
+    Server-Timing: db;dur=12.1, db-count;desc="2", serialize;dur=3.4,
+                   encode;dur=1.2, total;dur=19.8
+
+`db` covers the time spent in cursor executions, `serialize` the schema
+dumps wrapped in `timer("serialize")` and `encode` the JSON encoding.
+With `SERVER_TIMING_LOG` enabled a JSON line is also logged per request.
+"""
+import json
+from collections import defaultdict
+from contextlib import contextmanager
+from logging import getLogger
+from time import perf_counter
+
+from flask import current_app, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+logger = getLogger(__name__)
+
+
+class Timings:
+    def __init__(self):
+        self.start = perf_counter()
+        self.durations = defaultdict(float)
+        self.db_count = 0
+
+    def add(self, name, duration):
+        self.durations[name] += duration
+
+    def metrics(self):
+        metrics = dict(
+            total=perf_counter() - self.start,
+            db=self.durations.get("db", 0.0),
+            db_count=self.db_count,
+        )
+
+        metrics.update(self.durations)
+
+        return metrics
+
+    def header(self):
+        metrics = self.metrics()
+        values = [
+            f"db;dur={metrics.pop('db') * 1000:.1f}",
+            f'db-count;desc="{metrics.pop("db_count")}"',
+        ]
+        total = metrics.pop("total")
+
+        values.extend(
+            f"{name};dur={duration * 1000:.1f}" for name, duration in metrics.items()
+        )
+        values.append(f"total;dur={total * 1000:.1f}")
+
+        return ", ".join(values)
+
+
+def get_timings():
+    if not has_app_context():
+        return None
+
+    return g.get("_timings")
+
+
+@contextmanager
+def timer(name):
+    """
+    Add the duration of the block to the `name` metric of the request.
+    """
+    timings = get_timings()
+
+    if timings is None:
+        yield
+        return
+
+    start = perf_counter()
+
+    try:
+        yield
+
+    finally:
+        timings.add(name, perf_counter() - start)
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # On the execution context, a failed statement never reaches
+    # `after_cursor_execute`.
+    context._timing_start = perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = context._timing_start
+    timings = get_timings()
+
+    if timings is not None:
+        timings.add("db", perf_counter() - start)
+        timings.db_count += 1
+
+
+def start_timings():
+    g._timings = Timings()
+
+
+def add_server_timing(response):
+    timings = get_timings()
+
+    if timings is None:
+        return response
+
+    response.headers["Server-Timing"] = timings.header()
+
+    if current_app.config.get("SERVER_TIMING_LOG"):
+        metrics = timings.metrics()
+        line = dict(
+            method=request.method,
+            path=request.path,
+            status=response.status_code,
+            db_count=metrics.pop("db_count"),
+        )
+
+        for name, duration in metrics.items():
+            line[f"{name}_ms"] = round(duration * 1000, 3)
+
+        logger.info(json.dumps(line))
+
+    return response
+
+
+def init_timing(app):
+    if not app.config.get("SERVER_TIMING", True):
+        return
+
+    for name, listener in (
+        ("before_cursor_execute", before_cursor_execute),
+        ("after_cursor_execute", after_cursor_execute),
+    ):
+        if not event.contains(Engine, name, listener):
+            event.listen(Engine, name, listener)
+
+    app.before_request(start_timings)
+    app.after_request(add_server_timing)